@@ -0,0 +1,112 @@
+# Benchmarks: common/kernels.py against the row-wise pandas code it replaced in the dashboard
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from common.kernels import (
+    TEMP_BIN_EDGES_F, TEMP_BIN_LABELS, DAY_NAMES, bin_codes, weekday_codes, grouped_pivot, day_over_day, join_coordinates
+)
+
+REGISTRY = {
+    f"Region {i}": {"lat": 25 + (i % 25), "lon": -125 + (i % 55)}
+    for i in range(200)
+}
+
+
+def synthetic_frame(rows, seed=0):
+    """
+    Long-format frame shaped like the processed data: one row per region and day.
+    """
+    rng = np.random.default_rng(seed)
+    regions = list(REGISTRY)
+    days = rows // len(regions)
+    dates = pd.date_range("2000-01-01", periods=days, freq="D")
+    return pd.DataFrame({
+        "date": np.tile(dates.values, len(regions)),
+        "city": np.repeat(regions, days),
+        "avg_temp": rng.normal(60, 20, days * len(regions)),
+        "energy_consumption": rng.normal(300000, 50000, days * len(regions)),
+    })
+
+
+# Legacy implementations, as they were in dashboard/app.py
+
+def temp_bin(temp):
+    if temp < 32:
+        return "Freezing (<32°F)"
+    elif 32 <= temp < 50:
+        return "Cold (32–50°F)"
+    elif 50 <= temp < 70:
+        return "Mild (50–70°F)"
+    elif 70 <= temp < 85:
+        return "Warm (70–85°F)"
+    else:
+        return "Hot (>85°F)"
+
+
+def legacy_heatmap(df):
+    df = df.copy()
+    df["temp_range"] = df["avg_temp"].apply(temp_bin)
+    df["day_of_week"] = pd.to_datetime(df["date"]).dt.day_name()
+    pivot = df.groupby(["temp_range", "day_of_week"])["energy_consumption"].mean().unstack().fillna(0)
+    return pivot.reindex(TEMP_BIN_LABELS).reindex(columns=DAY_NAMES).to_numpy()
+
+
+def kernel_heatmap(df):
+    return grouped_pivot(
+        bin_codes(df["avg_temp"], TEMP_BIN_EDGES_F), weekday_codes(df["date"]), df["energy_consumption"],
+        len(TEMP_BIN_LABELS), len(DAY_NAMES),
+    )
+
+
+def legacy_coordinates(df):
+    coords = {name: [entry["lat"], entry["lon"]] for name, entry in REGISTRY.items()}
+    lat = df["city"].map(lambda x: coords.get(x, [0, 0])[0])
+    lon = df["city"].map(lambda x: coords.get(x, [0, 0])[1])
+    return lat.to_numpy(), lon.to_numpy()
+
+
+def legacy_day_over_day(df):
+    prev = df[["city", "date", "energy_consumption"]].copy()
+    prev["date"] = prev["date"] + pd.Timedelta(days=1)
+    merged = df.merge(prev, on=["city", "date"], how="left", suffixes=("", "_prev_day"))
+    return ((merged["energy_consumption"] - merged["energy_consumption_prev_day"]) / merged["energy_consumption_prev_day"] * 100).to_numpy()
+
+
+def timed(func, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard analytics kernels")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = synthetic_frame(args.rows)
+    print(f"{len(df):,} rows, {df['city'].nunique()} regions")
+
+    # The kernels must agree with the code they replace
+    assert np.allclose(legacy_heatmap(df), kernel_heatmap(df), equal_nan=True)
+    assert np.allclose(legacy_coordinates(df)[0], join_coordinates(df["city"], REGISTRY)[0])
+    assert np.allclose(legacy_day_over_day(df), day_over_day(df["city"], df["date"], df["energy_consumption"]), equal_nan=True)
+
+    cases = [
+        ("temperature bins + heatmap pivot", legacy_heatmap, kernel_heatmap),
+        ("coordinate join", legacy_coordinates, lambda d: join_coordinates(d["city"], REGISTRY)),
+        ("day-over-day % change", legacy_day_over_day, lambda d: day_over_day(d["city"], d["date"], d["energy_consumption"])),
+    ]
+    print(f"{'case':<34}{'legacy (s)':>12}{'kernel (s)':>12}{'speedup':>10}")
+    for name, legacy, kernel in cases:
+        legacy_s = timed(legacy, df, repeat=args.repeat)
+        kernel_s = timed(kernel, df, repeat=args.repeat)
+        print(f"{name:<34}{legacy_s:>12.3f}{kernel_s:>12.3f}{legacy_s / kernel_s:>9.1f}x")
@@ -0,0 +1,58 @@
+# common/fileio.py
+
+import os
+import json
+import fcntl
+import tempfile
+from contextlib import contextmanager
+
+
+@contextmanager
+def file_lock(path, shared=False):
+    """
+    Advisory lock on `path` (created if missing) held for the duration of the block.
+    Coordinates writers, and readers that need a consistent view, across processes;
+    shared=True lets several readers in while still excluding writers.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def reserve_path(stem, suffix):
+    """
+    Claims a file name that no other writer holds: `{stem}{suffix}`, or
+    `{stem}_{n}{suffix}` if that is taken, created empty with O_EXCL so two
+    processes (or two saves in the same second) can never get the same file.
+    Returns the path; the caller replaces the empty file with the real content.
+    """
+    attempt = 0
+    while True:
+        path = f"{stem}{suffix}" if attempt == 0 else f"{stem}_{attempt}{suffix}"
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+            return path
+        except FileExistsError:
+            attempt += 1
+
+
+def write_json_atomic(path, payload):
+    """
+    Writes JSON to a temp file in the same directory and renames it over `path`,
+    so readers never see a partially written file.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(payload, f, indent=2)
+        os.chmod(tmp_path, 0o644)  # mkstemp creates owner-only files
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
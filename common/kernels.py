@@ -0,0 +1,117 @@
+# common/kernels.py
+
+import numpy as np
+import pandas as pd
+
+# avg_temp is built from NOAA's TMAX/TMIN, which are tenths of a degree Celsius
+TEMP_UNITS_PER_F = 10 * 5 / 9
+
+
+def fahrenheit_to_data(values):
+    """
+    Converts °F temperatures to the data's units (tenths of °C).
+    """
+    return (np.asarray(values, dtype="float64") - 32) * TEMP_UNITS_PER_F
+
+
+# Temperature bins used by the usage heatmap, labelled in °F and applied in data
+# units; a value equal to an edge falls in the upper bin
+TEMP_BIN_EDGES_F = [32, 50, 70, 85]
+TEMP_BIN_EDGES = fahrenheit_to_data(TEMP_BIN_EDGES_F)
+TEMP_BIN_LABELS = ["Freezing (<32°F)", "Cold (32–50°F)", "Mild (50–70°F)", "Warm (70–85°F)", "Hot (>85°F)"]
+
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def bin_codes(values, edges=TEMP_BIN_EDGES):
+    """
+    Bin index of every value for the given ascending edges (len(edges) + 1 bins).
+    NaN values get -1.
+    """
+    values = np.asarray(values, dtype="float64")
+    codes = np.searchsorted(np.asarray(edges, dtype="float64"), values, side="right")
+    return np.where(np.isnan(values), -1, codes)
+
+
+def weekday_codes(dates):
+    """
+    Day of week (0=Monday) for any array-like of dates; datetime64 arrays are used as is.
+    """
+    dates = np.asarray(dates)
+    if not np.issubdtype(dates.dtype, np.datetime64):
+        dates = pd.to_datetime(pd.Series(dates.ravel())).values.reshape(dates.shape)
+    # 1970-01-01 was a Thursday
+    return (dates.astype("datetime64[D]").astype(np.int64) + 3) % 7
+
+
+def grouped_pivot(row_codes, col_codes, values, n_rows, n_cols, fill=0.0):
+    """
+    Mean of values for every (row, column) cell as an (n_rows, n_cols) array.
+    Codes outside the grid (e.g. -1) and NaN values are ignored; empty cells get `fill`.
+    """
+    row_codes = np.asarray(row_codes)
+    col_codes = np.asarray(col_codes)
+    values = np.asarray(values, dtype="float64")
+    keep = (row_codes >= 0) & (row_codes < n_rows) & (col_codes >= 0) & (col_codes < n_cols) & ~np.isnan(values)
+
+    cells = row_codes[keep] * n_cols + col_codes[keep]
+    sums = np.bincount(cells, weights=values[keep], minlength=n_rows * n_cols)
+    counts = np.bincount(cells, minlength=n_rows * n_cols)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts, fill)
+    return means.reshape(n_rows, n_cols)
+
+
+def day_over_day(groups, dates, values):
+    """
+    % change of each value from the same group's value on the previous calendar day
+    (NaN when that day is missing). Inputs are equal-length arrays in any order.
+    """
+    groups = pd.factorize(pd.Series(groups))[0]
+    days = pd.to_datetime(pd.Series(dates)).values.astype("datetime64[D]").astype(np.int64)
+    values = np.asarray(values, dtype="float64")
+
+    order = np.lexsort((days, groups))
+    g, d, v = groups[order], days[order], values[order]
+    has_prev = np.zeros(len(v), dtype=bool)
+    has_prev[1:] = (g[1:] == g[:-1]) & (d[1:] == d[:-1] + 1)
+    prev = np.full(len(v), np.nan)
+    prev[1:] = np.where(has_prev[1:], v[:-1], np.nan)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pct = (v - prev) / prev * 100
+    out = np.empty(len(v))
+    out[order] = pct
+    return out
+
+
+def join_coordinates(regions, registry):
+    """
+    (latitude, longitude) arrays for a column of region names, looked up in a
+    registry shaped like CITY_CONFIG ({region: {"lat": ..., "lon": ...}}).
+    Unknown regions get 0, 0.
+    """
+    names = list(registry)
+    lat = np.array([registry[n].get("lat", 0.0) for n in names] + [0.0])
+    lon = np.array([registry[n].get("lon", 0.0) for n in names] + [0.0])
+    codes = pd.Categorical(regions, categories=names).codes  # -1 for unknown, which picks the trailing 0
+    return lat[codes], lon[codes]
+
+
+def finite_xy(x, y):
+    """
+    Mask of positions where both x and y are finite, plus the masked arrays.
+    """
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    mask = np.isfinite(x) & np.isfinite(y)
+    return mask, x[mask], y[mask]
+
+
+def true_runs(mask):
+    """
+    (start, end) index pairs of the runs of True in a boolean array, end exclusive.
+    """
+    padded = np.concatenate(([False], np.asarray(mask, dtype=bool), [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return edges[0::2], edges[1::2]
@@ -0,0 +1,178 @@
+# common/series_store.py
+
+import numpy as np
+import pandas as pd
+
+# Per-city series kept by the store, keyed by the processed-data column they come from
+SERIES_FIELDS = {
+    "tmax": "TMAX",
+    "tmin": "TMIN",
+    "avg_temp": "avg_temp",
+    "energy": "energy_consumption",
+}
+
+
+class CitySeries:
+    """
+    One city's daily series as contiguous float arrays over the store's
+    fixed daily index. Days without data hold NaN.
+    """
+    __slots__ = ("city", "store", "tmax", "tmin", "avg_temp", "energy", "last")
+
+    def __init__(self, city, store, tmax, tmin, avg_temp, energy):
+        self.city = city
+        self.store = store
+        self.tmax = tmax
+        self.tmin = tmin
+        self.avg_temp = avg_temp
+        self.energy = energy
+        # Last offset with an energy value, found once so latest-day lookups stay constant time
+        valid = np.flatnonzero(~np.isnan(energy))
+        self.last = int(valid[-1]) if len(valid) else -1
+
+    def at(self, date, field="energy"):
+        """
+        Value of a field on a date (constant time).
+        """
+        offset = self.store.offset(date)
+        if offset < 0 or offset >= len(self.store.dates):
+            return np.nan
+        return getattr(self, field)[offset]
+
+    def slice(self, start=None, end=None, field="energy"):
+        """
+        Zero-copy view of a field between two dates (inclusive).
+        """
+        return getattr(self, field)[self.store.window(start, end)]
+
+    def latest_offset(self):
+        """
+        Offset of the last day with an energy value, or -1 if there is none.
+        """
+        return self.last
+
+    def day_over_day(self, offset, field="energy"):
+        """
+        (value, previous-day value, % change) at an offset.
+        """
+        values = getattr(self, field)
+        current = values[offset]
+        previous = values[offset - 1] if offset > 0 else np.nan
+        pct_change = (current - previous) / previous * 100 if previous else np.nan
+        return current, previous, pct_change
+
+
+class SeriesStore:
+    """
+    Struct-of-arrays store of all cities' daily series on one fixed daily index,
+    so date lookups are an integer offset and range slices are array views.
+    """
+    __slots__ = ("start", "dates", "series")
+
+    def __init__(self, start, end):
+        self.start = np.datetime64(pd.Timestamp(start).date(), "D")
+        self.dates = np.arange(self.start, np.datetime64(pd.Timestamp(end).date(), "D") + 1)
+        self.series = {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "SeriesStore":
+        """
+        Builds the store from a long-format processed frame (one row per city and day).
+        A frame that still carries EIA's type column is narrowed to demand ("D");
+        if a city then has several rows for a day, a ValueError is raised rather
+        than picking one, since which series it is cannot be told from row order.
+        """
+        if "type" in df.columns:
+            df = df[df["type"] == "D"]
+
+        if df.empty:
+            today = pd.Timestamp.today()
+            return cls(today, today)
+
+        dates = pd.to_datetime(df["date"])
+        store = cls(dates.min(), dates.max())
+
+        frame = df.assign(date=dates)
+        duplicated = frame.duplicated(subset=["city", "date"])
+        if duplicated.any():
+            cities = sorted(frame.loc[duplicated, "city"].unique())
+            raise ValueError(
+                f"Several rows per day for {', '.join(cities)}; the frame mixes EIA series. "
+                "Rebuild it with pipeline/backfill.py so only demand is kept."
+            )
+        offsets = (frame["date"].values.astype("datetime64[D]") - store.start).astype(np.int64)
+
+        for city, positions in frame.groupby("city").indices.items():
+            city_offsets = offsets[positions]
+            arrays = {}
+            for field, column in SERIES_FIELDS.items():
+                values = np.full(len(store.dates), np.nan)
+                if column in frame.columns:
+                    values[city_offsets] = frame[column].to_numpy(dtype="float64")[positions]
+                arrays[field] = values
+            store.series[city] = CitySeries(city, store, **arrays)
+        return store
+
+    def __getitem__(self, city) -> CitySeries:
+        return self.series[city]
+
+    def __contains__(self, city):
+        return city in self.series
+
+    @property
+    def cities(self):
+        return list(self.series)
+
+    def offset(self, date) -> int:
+        """
+        Position of a date in the daily index.
+        """
+        return int((np.datetime64(pd.Timestamp(date).date(), "D") - self.start).astype(np.int64))
+
+    def window(self, start=None, end=None) -> slice:
+        """
+        Slice of the daily index covering [start, end], clipped to the stored range.
+        """
+        first = max(self.offset(start), 0) if start is not None else 0
+        last = min(self.offset(end), len(self.dates) - 1) if end is not None else len(self.dates) - 1
+        return slice(first, last + 1)
+
+    def latest_offset(self, cities=None) -> int:
+        """
+        Last offset with data for any of the given cities.
+        """
+        offsets = [self.series[c].latest_offset() for c in (cities or self.cities) if c in self.series]
+        return max(offsets, default=-1)
+
+    def snapshot(self, offset, cities=None) -> pd.DataFrame:
+        """
+        One row per city with its values on a day and the % change in energy from the day before.
+        """
+        rows = []
+        for city in cities or self.cities:
+            if city not in self.series:
+                continue
+            series = self.series[city]
+            energy, previous, pct_change = series.day_over_day(offset)
+            rows.append({
+                "city": city,
+                "date": pd.Timestamp(self.dates[offset]),
+                "avg_temp": series.avg_temp[offset],
+                "energy_consumption": energy,
+                "energy_consumption_prev_day": previous,
+                "pct_change": pct_change,
+            })
+        return pd.DataFrame(rows)
+
+    def to_frame(self, city, start=None, end=None) -> pd.DataFrame:
+        """
+        A city's series between two dates as a frame (for plotting).
+        """
+        window = self.window(start, end)
+        series = self.series[city]
+        return pd.DataFrame({
+            "date": self.dates[window],
+            "city": city,
+            "avg_temp": series.avg_temp[window],
+            "energy_consumption": series.energy[window],
+        })
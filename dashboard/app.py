@@ -9,29 +9,35 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
 from quality.check_missing import check_missing_values
-from quality.check_outliers import check_temperature_outliers, check_energy_outliers
-from quality.check_freshness import check_data_freshness
+from quality.check_outliers import check_energy_outliers, flag_statistical_outliers, load_outlier_state
+from quality.check_freshness import check_freshness_by_city, check_freshness_from_index
+from common.series_store import SeriesStore
+from common.kernels import (
+    TEMP_BIN_LABELS, DAY_NAMES, bin_codes, weekday_codes, grouped_pivot, join_coordinates, finite_xy, true_runs
+)
+from pipeline.config import CITY_CONFIG
+from pipeline.catalog import ensure_catalog, load_catalog, current_dataset, verify_dataset
+from forecasting.scenarios import run_scenarios
 import numpy as np
 
 
 logger = get_logger("dashboard")
 
 # Load historical data
-@st.cache_data(ttl=3600)
-def load_data():
+# Cached per catalog entry (entries never change; a new dataset is a new entry),
+# so the cache key and the loaded file always come from the same catalog read
+@st.cache_data
+def load_data(dataset):
     try:
-        files = [f for f in os.listdir("data/processed") if f.endswith('.csv')]
-        if not files:
+        if dataset is None:
             logger.error("No historical data files found.")
             return pd.DataFrame()
         
-        latest_file = max(files, key=lambda x: os.path.getctime(os.path.join("data/processed", x)))
-        path = os.path.join("data/processed", latest_file)
+        latest_file = dataset["file"]
+        path = verify_dataset(dataset)
         df = pd.read_csv(path)
         df["avg_temp"] = (df["TMAX"] + df["TMIN"]) / 2
-        df["day_of_week"] = pd.to_datetime(df["date"]).dt.day_name()
         logger.info(f"Loaded historical data from {latest_file}.")
         
         return df
@@ -40,19 +46,42 @@ def load_data():
         logger.error(f"Error loading data: {e}")
         return pd.DataFrame()
     
+# Per-city arrays on a fixed daily index, built once per data load
+@st.cache_resource
+def load_store(dataset):
+    return SeriesStore.from_frame(load_data(dataset))
+
+# Scenario results are cached per dataset and scenario parameters
+@st.cache_data
+def load_scenarios(dataset, deltas_f, n_paths, horizon, noise_f, seed):
+    return run_scenarios(dataset, deltas_f, n_paths, horizon, noise_f, seed, store=load_store(dataset))
+
 # Run quality checks
-def run_quality_checks(df):
+def run_quality_checks(df, store):
     missing_summary = check_missing_values(df)
-    temp_outliers = check_temperature_outliers(df)
+    # Scored against the pipeline's per-city, per-month statistics (read-only)
+    stat_outliers = flag_statistical_outliers(df, load_outlier_state())
     energy_outliers = check_energy_outliers(df)
-    data_freshness = check_data_freshness(df)
+    # Per-region freshness and gaps come from the metadata index; fall back to the
+    # in-memory store for data written before the index existed
+    data_freshness = check_freshness_from_index()
+    if data_freshness.empty:
+        data_freshness = check_freshness_by_city(store)
     
-    return missing_summary, temp_outliers, energy_outliers, data_freshness
+    return missing_summary, stat_outliers, energy_outliers, data_freshness
 
 
 # Load historical data
-df = load_data()
-cities = df["city"].unique().tolist()
+ensure_catalog()
+# One catalog read decides which dataset this session shows
+dataset = current_dataset(load_catalog())
+df = load_data(dataset)
+try:
+    store = load_store(dataset)
+except ValueError as e:
+    st.error(f"Cannot load the current dataset: {e}")
+    st.stop()
+cities = store.cities
 df["date"] = pd.to_datetime(df["date"])
 
 # Sidebar Filters
@@ -61,8 +90,8 @@ selected_city = st.sidebar.multiselect("Select Cities", cities, default=cities)
 
 # selected_data_type = st.sidebar.selectbox("Select Data Type", options=["All", "Temperature", "Energy"]) if not df.empty else "All"
 if not df.empty:
-    min_date = df["date"].min().to_pydatetime()
-    max_date = df["date"].max().to_pydatetime()
+    min_date = pd.Timestamp(store.dates[0]).to_pydatetime()
+    max_date = pd.Timestamp(store.dates[-1]).to_pydatetime()
 
     # Default value is latest 30 days
     default_start = max_date - pd.Timedelta(days=30)
@@ -86,11 +115,11 @@ st.markdown(f"Last updated: **{df['date'].max().strftime('%Y-%m-%d')}**")
 # Display Data
 if not df.empty:
     st.header("Data Quality Checks")
-    missing_summary, temp_outliers, energy_outliers, data_freshness = run_quality_checks(df)
+    missing_summary, stat_outliers, energy_outliers, data_freshness = run_quality_checks(df, store)
     st.subheader("Missing Values Summary")
     st.write(missing_summary)
-    st.subheader("Temperature Outliers")
-    st.write(temp_outliers)
+    st.subheader("Statistical Outliers")
+    st.write(stat_outliers)
     st.subheader("Energy Outliers")
     st.write(energy_outliers)
     st.subheader("Data Freshness")
@@ -101,33 +130,24 @@ def display_geographical_overview(df):
     # Visualization 1 - Geographical Overview
     st.subheader("Geographical Overview")
     
-    # Dummy coordinates (replace with accurate ones if needed)
-    city_coords = {
-        "New York": [40.7128, -74.0060],
-        "Chicago": [41.8781, -87.6298],
-        "Houston": [29.7604, -95.3698],
-        "Phoenix": [33.4484, -112.0740],
-        "Seattle": [47.6062, -122.3321]
-    }
-    
     if df.empty:
         st.warning("No data available for geographical overview.")
         return
-    st.caption(f"Data from {df['date'].min()} to {df['date'].max()}")
-    
-    latest_df = df[df["date"] == df["date"].max()]
     
-    latest_df["latitude"] = latest_df["city"].map(lambda x: city_coords.get(x, [0, 0])[0])
-    latest_df["longitude"] = latest_df["city"].map(lambda x: city_coords.get(x, [0, 0])[1])
-    
-    # calculate % change from previous day
-    prev_day = df["date"].max() - timedelta(days=1)
+    # Latest day in the selected range, read off the store's daily index
+    window = store.window(*selected_date_range)
+    latest_offset = min(window.stop - 1, store.latest_offset(selected_city))
+    if latest_offset < 0:
+        st.warning("No data available for geographical overview.")
+        return
+    st.caption(f"Data from {store.dates[window.start]} to {store.dates[latest_offset]}")
     
-    prev_day_df = df[df["date"] == prev_day][["city", "energy_consumption"]]
+    # Latest values and % change from previous day, one row per city
+    latest_df = store.snapshot(latest_offset, selected_city)
     
-    latest_df = latest_df.merge(prev_day_df, on="city", how="left", suffixes=("", "_prev_day"))
+    # Coordinates come from the region registry (CITY_CONFIG)
+    latest_df["latitude"], latest_df["longitude"] = join_coordinates(latest_df["city"], CITY_CONFIG)
     
-    latest_df["pct_change"] = ((latest_df["energy_consumption"] - latest_df["energy_consumption_prev_day"]) / latest_df["energy_consumption_prev_day"]) * 100
     # If negative energy values are invalid for your map, filter them out:
     latest_df["bubble_size"] = latest_df["energy_consumption"].abs()
     
@@ -164,23 +184,24 @@ def time_series_analysis(df):
         ["All Cities"] + cities,
         key="time_series_city_select"
     )
-    plot_df = df if selected_city == "All Cities" else df[df["city"] == selected_city]
+    plot_df = df if selected_city == "All Cities" else store.to_frame(selected_city, *selected_date_range)
         
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=plot_df["date"], y=plot_df["avg_temp"], name="Avg Temp (°F)", yaxis="y1", mode="lines+markers", line=dict(color="blue")))
     fig.add_trace(go.Scatter(x=plot_df["date"], y=plot_df["energy_consumption"], name="Energy Conm (MWh)", yaxis="y2", mode="lines+markers", line=dict(color="orange")))
     
-    # Highlight Weekends
-    for date in pd.to_datetime(plot_df["date"]):
-        if date.weekday() >= 5:
-            fig.add_vrect(
-                x0=date - pd.Timedelta(days=1),
-                x1=date + pd.Timedelta(days=1),
-                fillcolor="yellow",
-                opacity=0.3,
-                layer="below",
-                line_width=0,
-            )
+    # Highlight Weekends: one band per run of consecutive weekend days
+    dates = np.unique(pd.to_datetime(plot_df["date"]).values.astype("datetime64[D]"))
+    run_starts, run_ends = true_runs(weekday_codes(dates) >= 5)
+    for start, end in zip(run_starts, run_ends):
+        fig.add_vrect(
+            x0=pd.Timestamp(dates[start]) - pd.Timedelta(days=1),
+            x1=pd.Timestamp(dates[end - 1]) + pd.Timedelta(days=1),
+            fillcolor="yellow",
+            opacity=0.3,
+            layer="below",
+            line_width=0,
+        )
         
     fig.update_layout(
         title=f"Temperature and Energy Consumption in {selected_city} ({plot_df['date'].min()} to {plot_df['date'].max()})",
@@ -228,39 +249,26 @@ def regression_analysis(df):
     import plotly.express as px
     import streamlit as st
 
-    # Validate and clean data
-    df = df.replace([np.inf, -np.inf], np.nan).dropna(subset=["avg_temp", "energy_consumption"])
-
-    # Prepare features and target
-    X = df[["avg_temp"]]
-    y = df["energy_consumption"]
+    # Validate and clean data: keep rows where both values are finite, as plain arrays
+    mask, x, y = finite_xy(df["avg_temp"], df["energy_consumption"])
 
     # Fit linear regression model
     model = LinearRegression()
-    model.fit(X, y)
-
-    # Predict energy consumption
-    df["predicted_energy"] = model.predict(X)
-
-    # Rename columns for visualization if needed
-    df = df.rename(columns={
-        "avg_temp": "Temperature",
-        "energy_consumption": "Energy Consumption"
-    })
+    model.fit(x.reshape(-1, 1), y)
 
     # Create scatter plot with regression line
     scatter_fig = px.scatter(
-        df,
-        x="Temperature",
-        y="Energy Consumption",
+        x=x,
+        y=y,
+        labels={"x": "Temperature", "y": "Energy Consumption"},
         title="Temperature vs Energy Consumption with Regression Line",
-        hover_data=["date"]
+        hover_data={"date": df["date"].to_numpy()[mask]}
     )
 
+    order = np.argsort(x)
     scatter_fig.add_traces(px.line(
-        df.sort_values(by="Temperature"),
-        x="Temperature",
-        y="predicted_energy"
+        x=x[order],
+        y=model.predict(x[order].reshape(-1, 1))
     ).data)
 
     # Display plot in Streamlit
@@ -280,53 +288,38 @@ def daily_avg_temperature(df):
     fig.update_layout(template="plotly_white", height=600)
     st.plotly_chart(fig, use_container_width=True)
     
-# Helper function to categorize temperatures into bins
-def temp_bin(temp):
-    if temp < 32:
-        return "Freezing (<32°F)"
-    elif 32 <= temp < 50:
-        return "Cold (32–50°F)"
-    elif 50 <= temp < 70:
-        return "Mild (50–70°F)"
-    elif 70 <= temp < 85:
-        return "Warm (70–85°F)"
-    else:
-        return "Hot (>85°F)"
-
 # Visualization 7 - Usage Patterns Heatmap
 def usage_patterns_heatmap(df):
     st.header("📊 Usage Patterns Heatmap")
 
     # Ensure cities list is derived from the data
-    cities = sorted(df["city"].dropna().unique())
+    cities = sorted(c for c in df["city"].dropna().unique() if c in store)
+    if not cities:
+        st.warning("No data available for the usage heatmap.")
+        return
     selected_city = st.selectbox("Select a City", cities)
 
-    # Filter the dataframe for the selected city
-    city_df = df[df["city"] == selected_city].copy()
-
-    # Categorize temperatures
-    city_df["temp_range"] = city_df["avg_temp"].apply(temp_bin)
-
-    # Create a pivot table: average energy consumption by temp range and day of week
-    pivot_table = (
-        city_df.groupby(["temp_range", "day_of_week"])["energy_consumption"]
-        .mean()
-        .unstack()
-        .fillna(0)
+    # The selected city's arrays over the selected date range (views, no copies)
+    series = store[selected_city]
+    window = store.window(*selected_date_range)
+
+    # Average energy consumption by temperature range (rows) and day of week (columns)
+    pivot_table = grouped_pivot(
+        bin_codes(series.avg_temp[window]),
+        weekday_codes(store.dates[window]),
+        series.energy[window],
+        len(TEMP_BIN_LABELS),
+        len(DAY_NAMES),
     )
 
-    # Ensure logical order of temperature bins and days of the week
-    temp_order = ["Freezing (<32°F)", "Cold (32–50°F)", "Mild (50–70°F)", "Warm (70–85°F)", "Hot (>85°F)"]
-    day_order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    pivot_table = pivot_table.reindex(temp_order)
-    pivot_table = pivot_table.reindex(columns=day_order)
-
     # Plot heatmap
     fig = px.imshow(
         pivot_table,
+        x=DAY_NAMES,
+        y=TEMP_BIN_LABELS,
         text_auto=".1f",
         color_continuous_scale="RdBu_r",
-        labels={"x": "Day of Week", "y": "Temperature Range", "color": "Avg Energy (kWh)"},
+        labels={"x": "Day of Week", "y": "Temperature Range", "color": "Avg Energy (MWh)"},
         title=f"Average Energy Consumption in {selected_city} by Temperature and Day of Week",
         height=600
     )
@@ -335,6 +328,39 @@ def usage_patterns_heatmap(df):
     st.plotly_chart(fig, use_container_width=True)
     
 
+# Weather Sensitivity Scenarios
+def weather_scenarios():
+    st.header("🌡️ Weather Sensitivity Scenarios")
+
+    shift_range = st.slider("Temperature shift (°F)", min_value=-15, max_value=15, value=(-5, 5))
+    steps = st.number_input("Shift steps", min_value=1, max_value=61, value=11)
+    n_paths = st.number_input("Synthetic weather paths per shift", min_value=0, max_value=5000, value=200, step=100)
+    horizon = st.number_input("Horizon (days)", min_value=1, max_value=30, value=7)
+    noise_f = st.number_input("Daily weather noise (°F)", min_value=0.0, max_value=15.0, value=3.0)
+
+    deltas_f = tuple(float(d) for d in np.linspace(shift_range[0], shift_range[1], int(steps)))
+    summary, peak, system_peak, regions = load_scenarios(dataset, deltas_f, int(n_paths), int(horizon), float(noise_f), 0)
+    if summary.empty:
+        st.warning("No region has enough data for scenario simulation.")
+        return
+
+    st.markdown(f"**{len(system_peak):,}** scenarios × **{len(regions)}** regions × **{int(horizon)}** days")
+    st.subheader("Peak Demand Distribution")
+    st.write(summary)
+
+    # Peak demand across scenarios per region
+    fig = go.Figure()
+    for i, region in enumerate(regions):
+        fig.add_trace(go.Box(y=peak[i], name=region, boxpoints=False))
+    fig.update_layout(template="plotly_white", height=500, yaxis_title="Peak Daily Energy (MWh)", showlegend=False)
+    st.plotly_chart(fig, use_container_width=True)
+
+    fig = px.histogram(x=system_peak, nbins=50, labels={"x": "System Peak Daily Energy (MWh)"},
+                       title="System-wide Peak Demand Across Scenarios")
+    fig.update_layout(template="plotly_white", height=400)
+    st.plotly_chart(fig, use_container_width=True)
+
+
 def main():
     # Main Dashboard Layout
     st.sidebar.title("Dashboard Navigation")
@@ -347,6 +373,9 @@ def main():
         daily_energy_consumption(df)
         daily_avg_temperature(df)
         usage_patterns_heatmap(df)
+
+    if st.sidebar.checkbox("Weather Scenarios"):
+        weather_scenarios()
         
 if __name__ == "__main__":
     main()
@@ -0,0 +1,224 @@
+# Rolling-origin backtesting
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pipeline.catalog import current_dataset, ensure_catalog
+from forecasting.models import design_matrix, load_training_store
+from common.kernels import weekday_codes
+from common.loggerInfo import get_logger
+
+logger = get_logger("backtest")
+
+BACKTEST_DIR = "data/backtests"
+# temperature_regression forecasts with the served model's rule (last week's mean
+# temperature); the _oracle variant is given the observed temperatures of the test
+# days instead, an upper bound on what a perfect weather forecast would add.
+CANDIDATE_MODELS = ["temperature_regression", "temperature_regression_oracle", "seasonal_naive"]
+
+# Days averaged for the temperature assumed over the horizon, as in TemperatureRegressionModel
+RECENT_TEMP_DAYS = 7
+
+
+def prepare_region_arrays(dates, avg_temp, energy):
+    """
+    Precomputes everything the folds of one region need, once:
+    the feature matrix over the whole daily index (rows with missing data zeroed,
+    which leaves least-squares fits unchanged) and running sums of XᵀX and Xᵀy,
+    so the normal equations of any training window are a difference of two slices.
+    A running sum of the valid days' temperatures gives each fold's recent mean the same way.
+    """
+    valid = ~(np.isnan(avg_temp) | np.isnan(energy))
+    # Standardising temperature keeps XᵀX well conditioned; predictions are unaffected
+    temp_mean = np.nanmean(avg_temp[valid]) if valid.any() else 0.0
+    temp_std = np.nanstd(avg_temp[valid]) if valid.any() else 1.0
+    scaled = np.where(valid, (avg_temp - temp_mean) / (temp_std or 1.0), 0.0)
+
+    X = design_matrix(scaled, weekday_codes(dates)) * valid[:, None]
+    y = np.where(valid, energy, 0.0)
+
+    n, p = X.shape
+    xtx_cum = np.zeros((n + 1, p, p))
+    xty_cum = np.zeros((n + 1, p))
+    np.cumsum(X[:, :, None] * X[:, None, :], axis=0, out=xtx_cum[1:])
+    np.cumsum(X * y[:, None], axis=0, out=xty_cum[1:])
+    count_cum = np.concatenate(([0], np.cumsum(valid)))
+    # Running sum over valid days only, indexed by valid-day count
+    valid_temp_cum = np.concatenate(([0.0], np.cumsum(scaled[valid])))
+
+    return {
+        "X": X, "y": y, "valid": valid, "xtx_cum": xtx_cum, "xty_cum": xty_cum, "count_cum": count_cum,
+        "weekdays": weekday_codes(dates), "valid_temp_cum": valid_temp_cum,
+        "temp_mean": temp_mean, "temp_std": temp_std or 1.0,
+    }
+
+
+def fold_origins(n_days, horizon, min_train, step):
+    """
+    Forecast origins: the first test day of each fold.
+    """
+    return np.arange(min_train, n_days - horizon + 1, step)
+
+
+def fold_coefficients(arrays, origins, window):
+    """
+    Least-squares coefficients of every fold's training window [start, origin),
+    shape (folds, features), in the standardised temperature units of arrays["X"].
+    """
+    starts = np.maximum(origins - window, 0) if window else np.zeros_like(origins)
+    xtx = arrays["xtx_cum"][origins] - arrays["xtx_cum"][starts]
+    xty = arrays["xty_cum"][origins] - arrays["xty_cum"][starts]
+    return np.einsum("kij,kj->ki", np.linalg.pinv(xtx), xty)
+
+
+def recent_temperatures(arrays, origins, window):
+    """
+    Mean temperature of the last RECENT_TEMP_DAYS valid training days before each
+    origin (within the training window): what the served model assumes for
+    every day of the horizon, since no weather forecast is available at the origin.
+    """
+    starts = np.maximum(origins - window, 0) if window else np.zeros_like(origins)
+    last = arrays["count_cum"][origins]
+    first = np.maximum(last - RECENT_TEMP_DAYS, arrays["count_cum"][starts])
+    cum = arrays["valid_temp_cum"]
+    return (cum[last] - cum[first]) / np.maximum(last - first, 1)
+
+
+def _predict_folds(arrays, model, origins, horizon, window):
+    """
+    Predictions for every fold at once, shape (folds, horizon).
+    """
+    test_idx = origins[:, None] + np.arange(horizon)[None, :]
+    y = arrays["y"]
+
+    if model == "seasonal_naive":
+        # Same weekday of the week before the origin
+        observed = np.where(arrays["valid"], y, np.nan)
+        return observed[origins[:, None] - 7 + (np.arange(horizon)[None, :] % 7)]
+
+    # Training windows never materialise a matrix
+    coef = fold_coefficients(arrays, origins, window)
+
+    if model == "temperature_regression_oracle":
+        # Test rows gathered from the precomputed X, i.e. the observed test-day temperatures
+        return np.einsum("khp,kp->kh", arrays["X"][test_idx], coef)
+
+    # Only what is known at the origin: the recent mean temperature and the calendar
+    temps = np.repeat(recent_temperatures(arrays, origins, window), horizon)
+    X_test = design_matrix(temps, arrays["weekdays"][test_idx].ravel()).reshape(len(origins), horizon, -1)
+    return np.einsum("khp,kp->kh", X_test, coef)
+
+
+def backtest_region(region, dates, avg_temp, energy, horizon=7, min_train=28, step=1, window=None, models=None):
+    """
+    Rolling-origin evaluation of the candidate models for one region.
+    window=None grows the training window from the first day (expanding);
+    an integer keeps only the last `window` days (sliding).
+    Returns one row per scored (fold, horizon) with the actual value and forecast error.
+    """
+    arrays = prepare_region_arrays(dates, avg_temp, energy)
+    origins = fold_origins(len(dates), horizon, max(min_train, 7), step)
+    if len(origins) == 0:
+        return pd.DataFrame()
+
+    # Folds whose training window is too thin to fit are dropped
+    starts = np.maximum(origins - window, 0) if window else np.zeros_like(origins)
+    origins = origins[arrays["count_cum"][origins] - arrays["count_cum"][starts] >= 14]
+
+    test_idx = origins[:, None] + np.arange(horizon)[None, :]
+    actual = energy[test_idx]
+    scored = arrays["valid"][test_idx]
+
+    frames = []
+    for model in models or CANDIDATE_MODELS:
+        predicted = _predict_folds(arrays, model, origins, horizon, window)
+        ok = scored & ~np.isnan(predicted)
+        fold, h = np.nonzero(ok)
+        error = predicted[ok] - actual[ok]
+        frames.append(pd.DataFrame({
+            "region": region,
+            "model": model,
+            "origin": dates[origins[fold]],
+            "horizon": h + 1,
+            "actual": actual[ok],
+            "error": error,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def summarize_errors(errors: pd.DataFrame) -> pd.DataFrame:
+    """
+    MAPE (%) and RMSE per region, model and horizon.
+    """
+    errors = errors.assign(
+        ape=(errors["error"] / errors["actual"]).abs().where(errors["actual"] != 0) * 100,
+        se=errors["error"] ** 2,
+    )
+    summary = errors.groupby(["region", "model", "horizon"]).agg(
+        folds=("error", "size"), mape=("ape", "mean"), mse=("se", "mean")
+    ).reset_index()
+    summary["rmse"] = np.sqrt(summary.pop("mse"))
+    return summary
+
+
+def run_backtest(horizon=7, min_train=28, step=1, window=None, models=None, regions=None, max_workers=None):
+    """
+    Backtests every region and candidate model on the current processed dataset.
+    Each (region, model) runs its folds in a worker process; the metrics
+    table is written to data/backtests and returned.
+    """
+    ensure_catalog()
+    dataset = current_dataset()
+    if dataset is None:
+        logger.error("No processed dataset registered; nothing to backtest.")
+        return pd.DataFrame()
+
+    store = load_training_store(dataset)
+    regions = [r for r in (regions or store.cities) if r in store]
+    models = models or CANDIDATE_MODELS
+    if not regions:
+        logger.error("None of the requested regions are in the dataset; nothing to backtest.")
+        return pd.DataFrame()
+
+    logger.info(f"Backtesting {len(models)} models on {len(regions)} regions (horizon {horizon}, dataset v{dataset['version']})...")
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(
+                backtest_region, region, store.dates, store[region].avg_temp, store[region].energy,
+                horizon, min_train, step, window, [model],
+            )
+            for region in regions
+            for model in models
+        ]
+        errors = pd.concat([f.result() for f in futures], ignore_index=True)
+
+    if errors.empty:
+        logger.warning("Not enough data for any backtest fold.")
+        return pd.DataFrame()
+
+    summary = summarize_errors(errors)
+    os.makedirs(BACKTEST_DIR, exist_ok=True)
+    path = os.path.join(BACKTEST_DIR, f"backtest_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.csv")
+    summary.to_csv(path, index=False)
+    logger.info(f"Backtest metrics saved to {path}.")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the demand models")
+    parser.add_argument("--horizon", type=int, default=7)
+    parser.add_argument("--min-train", type=int, default=28, help="Days before the first origin")
+    parser.add_argument("--step", type=int, default=1, help="Days between origins")
+    parser.add_argument("--window", type=int, default=None, help="Sliding training window in days (expanding if omitted)")
+    parser.add_argument("--models", nargs="*", default=None, choices=CANDIDATE_MODELS)
+    parser.add_argument("--regions", nargs="*", default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    summary = run_backtest(args.horizon, args.min_train, args.step, args.window, args.models, args.regions, args.workers)
+    print(summary.to_string(index=False))
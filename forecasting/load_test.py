@@ -0,0 +1,68 @@
+# Load test for the forecast server
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import time
+import random
+import argparse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from pipeline.config import CITY_CONFIG
+
+
+def _request(base_url, batch, horizon):
+    regions = list(CITY_CONFIG)
+    if batch:
+        body = json.dumps({"regions": regions, "horizon": horizon}).encode()
+        request = urllib.request.Request(f"{base_url}/forecast/batch", data=body, headers={"Content-Type": "application/json"})
+    else:
+        region = urllib.request.quote(random.choice(regions))
+        request = urllib.request.Request(f"{base_url}/forecast?region={region}&horizon={horizon}")
+
+    started = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        response.read()
+    return time.perf_counter() - started
+
+
+def run_load_test(base_url, clients=16, requests_per_client=200, batch=False, horizon=7):
+    """
+    Fires requests from `clients` concurrent threads and returns latency percentiles (ms) and throughput.
+    """
+    def client(_):
+        return [_request(base_url, batch, horizon) for _ in range(requests_per_client)]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = np.concatenate([np.asarray(l) for l in pool.map(client, range(clients))]) * 1000
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "max_ms": float(latencies.max()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent load test for forecasting/server.py")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per client")
+    parser.add_argument("--batch", action="store_true", help="Use the batch endpoint for all regions")
+    parser.add_argument("--horizon", type=int, default=7)
+    parser.add_argument("--p99-ms", type=float, default=None, help="Exit non-zero if p99 latency exceeds this")
+    args = parser.parse_args()
+
+    report = run_load_test(args.url, args.clients, args.requests, args.batch, args.horizon)
+    print(json.dumps(report, indent=2))
+
+    if args.p99_ms is not None and report["p99_ms"] > args.p99_ms:
+        print(f"p99 latency {report['p99_ms']:.2f} ms exceeds target {args.p99_ms} ms")
+        sys.exit(1)
@@ -0,0 +1,176 @@
+# Per-region demand models
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import numpy as np
+import pandas as pd
+from common.series_store import SeriesStore
+from common.kernels import weekday_codes
+from pipeline.catalog import verify_dataset
+from pipeline.config import CITY_CONFIG
+from common.fileio import write_json_atomic
+from common.loggerInfo import get_logger
+
+logger = get_logger("models")
+
+MODELS_DIR = "data/models"
+
+
+def design_matrix(avg_temp, weekdays):
+    """
+    Features for the temperature model: intercept, temperature, temperature²
+    and six day-of-week dummies (Monday is the baseline).
+    avg_temp and weekdays are equal-length arrays; weekdays use 0=Monday.
+    """
+    avg_temp = np.asarray(avg_temp, dtype="float64")
+    weekdays = np.asarray(weekdays)
+    dummies = (weekdays[:, None] == np.arange(1, 7)[None, :]).astype("float64")
+    return np.column_stack([np.ones_like(avg_temp), avg_temp, avg_temp ** 2, dummies])
+
+
+class TemperatureRegressionModel:
+    """
+    Daily demand as a quadratic in average temperature plus day-of-week effects,
+    fitted by least squares.
+    """
+    name = "temperature_regression"
+
+    def __init__(self, coef=None, last_date=None, recent_temp=None):
+        self.coef = None if coef is None else np.asarray(coef, dtype="float64")
+        self.last_date = last_date
+        self.recent_temp = recent_temp
+
+    def fit(self, dates, avg_temp, energy):
+        valid = ~(np.isnan(avg_temp) | np.isnan(energy))
+        X = design_matrix(avg_temp[valid], weekday_codes(dates[valid]))
+        self.coef = np.linalg.lstsq(X, energy[valid], rcond=None)[0]
+        self.last_date = np.datetime64(dates[valid][-1], "D")
+        # Without a weather forecast, future days assume last week's mean temperature
+        self.recent_temp = float(np.nanmean(avg_temp[valid][-7:]))
+        return self
+
+    def predict(self, dates, avg_temp):
+        return design_matrix(avg_temp, weekday_codes(dates)) @ self.coef
+
+    def forecast(self, horizon, avg_temp=None):
+        """
+        Forecasts the `horizon` days after the last training day.
+        avg_temp optionally supplies the expected temperature for each of those days.
+        """
+        dates = self.last_date + np.arange(1, horizon + 1)
+        temps = np.full(horizon, self.recent_temp) if avg_temp is None else np.asarray(avg_temp, dtype="float64")
+        return dates, self.predict(dates, temps)
+
+    def to_dict(self):
+        return {"model": self.name, "coef": self.coef.tolist(), "last_date": str(self.last_date), "recent_temp": self.recent_temp}
+
+    @classmethod
+    def from_dict(cls, payload):
+        return cls(payload["coef"], np.datetime64(payload["last_date"], "D"), payload["recent_temp"])
+
+
+class SeasonalNaiveModel:
+    """
+    Repeats the last observed week: each forecast day takes the value seen seven days earlier.
+    """
+    name = "seasonal_naive"
+
+    def __init__(self, last_week=None, last_date=None):
+        self.last_week = None if last_week is None else np.asarray(last_week, dtype="float64")
+        self.last_date = last_date
+
+    def fit(self, dates, avg_temp, energy):
+        valid = ~np.isnan(energy)
+        self.last_date = np.datetime64(dates[valid][-1], "D")
+        end = np.flatnonzero(valid)[-1] + 1
+        self.last_week = energy[max(end - 7, 0):end]
+        return self
+
+    def predict(self, dates, avg_temp):
+        offsets = (np.asarray(dates, dtype="datetime64[D]") - self.last_date).astype(np.int64) - 1
+        return self.last_week[offsets % len(self.last_week)]
+
+    def forecast(self, horizon, avg_temp=None):
+        dates = self.last_date + np.arange(1, horizon + 1)
+        return dates, self.predict(dates, None)
+
+    def to_dict(self):
+        return {"model": self.name, "last_week": self.last_week.tolist(), "last_date": str(self.last_date)}
+
+    @classmethod
+    def from_dict(cls, payload):
+        return cls(payload["last_week"], np.datetime64(payload["last_date"], "D"))
+
+
+MODEL_REGISTRY = {
+    TemperatureRegressionModel.name: TemperatureRegressionModel,
+    SeasonalNaiveModel.name: SeasonalNaiveModel,
+}
+
+
+def fit_region_models(store: SeriesStore, model_name="temperature_regression", cities=None) -> dict:
+    """
+    Fits one model per region on the store's daily arrays.
+    Regions with too little data are skipped.
+    """
+    model_cls = MODEL_REGISTRY[model_name]
+    models = {}
+    for city in cities or store.cities:
+        if city not in store:
+            continue
+        series = store[city]
+        if np.count_nonzero(~(np.isnan(series.avg_temp) | np.isnan(series.energy))) < 14:
+            logger.warning(f"Not enough data to fit {model_name} for {city}.")
+            continue
+        models[city] = model_cls().fit(store.dates, series.avg_temp, series.energy)
+    return models
+
+
+def save_models(models: dict, version, model_name="temperature_regression") -> str:
+    """
+    Stores fitted models for a dataset version in the model registry directory.
+    """
+    path = os.path.join(MODELS_DIR, f"{model_name}_v{version}.json")
+    write_json_atomic(path, {city: model.to_dict() for city, model in models.items()})
+    return path
+
+
+def load_models(version, model_name="temperature_regression") -> dict:
+    """
+    Loads the models fitted for a dataset version, or None if they were never saved.
+    """
+    path = os.path.join(MODELS_DIR, f"{model_name}_v{version}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        payload = json.load(f)
+    return {city: MODEL_REGISTRY[entry["model"]].from_dict(entry) for city, entry in payload.items()}
+
+
+def models_for_dataset(dataset_entry: dict, model_name="temperature_regression", store: SeriesStore = None) -> dict:
+    """
+    Models for a catalogued dataset version: the saved ones if the registry has
+    them, otherwise fitted on the configured regions and saved, so every
+    consumer of a version uses the same coefficients.
+    `store` may be passed when the dataset is already loaded.
+    """
+    version = str(dataset_entry["version"])
+    models = load_models(version, model_name)
+    if models is None:
+        store = load_training_store(dataset_entry) if store is None else store
+        models = fit_region_models(store, model_name, cities=list(CITY_CONFIG))
+        save_models(models, version, model_name)
+    return models
+
+
+def load_training_store(dataset_entry: dict) -> SeriesStore:
+    """
+    Reads a catalogued processed file into a SeriesStore, adding avg_temp if it is missing.
+    The file's checksum is verified against the catalog first.
+    """
+    df = pd.read_csv(verify_dataset(dataset_entry))
+    if "avg_temp" not in df.columns:
+        df["avg_temp"] = (df["TMAX"] + df["TMIN"]) / 2
+    return SeriesStore.from_frame(df)
@@ -0,0 +1,151 @@
+# Multi-scenario weather sensitivity simulation
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from pipeline.catalog import current_dataset, ensure_catalog
+from forecasting.models import TemperatureRegressionModel, models_for_dataset, load_training_store
+from common.kernels import TEMP_UNITS_PER_F, weekday_codes
+from common.series_store import SeriesStore
+from common.loggerInfo import get_logger
+
+logger = get_logger("scenarios")
+
+# Upper bound on the (regions × scenarios × days) block evaluated at once
+CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def scenario_grid(deltas_f=(0.0,), n_paths=0, horizon=7, noise_f=3.0, persistence=0.7, seed=0):
+    """
+    Temperature perturbations, shape (scenarios, horizon), in model units:
+    one flat shift per value in deltas_f (°F) and, for every shift, n_paths
+    synthetic AR(1) weather paths with daily noise of noise_f °F around it.
+    """
+    if len(deltas_f) == 0:
+        raise ValueError("At least one temperature shift is required.")
+    deltas = np.asarray(deltas_f, dtype="float64")[:, None] * TEMP_UNITS_PER_F
+    shifts = np.repeat(deltas, horizon, axis=1)
+    if n_paths == 0:
+        return shifts
+
+    rng = np.random.default_rng(seed)
+    shocks = rng.normal(0.0, noise_f * TEMP_UNITS_PER_F, size=(len(deltas), n_paths, horizon))
+    noise = np.empty_like(shocks)
+    noise[..., 0] = shocks[..., 0]
+    for day in range(1, horizon):
+        noise[..., day] = persistence * noise[..., day - 1] + shocks[..., day]
+    paths = shifts[:, None, :] + noise
+    return np.concatenate([shifts, paths.reshape(-1, horizon)])
+
+
+def baseline_paths(store: SeriesStore, models: dict, horizon=7):
+    """
+    Per-region baseline for the days after each model's last training day:
+    the temperatures of the last `horizon` observed days (falling back to the
+    model's recent mean), plus the weekday of every simulated day.
+    Returns (regions, base temps (R, D), weekdays (R, D)).
+    """
+    regions = list(models)
+    base = np.empty((len(regions), horizon))
+    weekdays = np.empty((len(regions), horizon), dtype=np.int64)
+    for i, region in enumerate(regions):
+        model = models[region]
+        end = store.offset(model.last_date) + 1
+        recent = store[region].avg_temp[max(end - horizon, 0):end]
+        recent = np.where(np.isnan(recent), model.recent_temp, recent)
+        base[i] = np.resize(recent, horizon) if len(recent) else model.recent_temp
+        weekdays[i] = weekday_codes(model.last_date + np.arange(1, horizon + 1))
+    return regions, base, weekdays
+
+
+def simulate(models: dict, base, weekdays, perturbations, max_workers=4, chunk_bytes=CHUNK_BYTES):
+    """
+    Demand for every (region × scenario × day) as one broadcasted computation
+    per chunk of scenarios. Chunks run on a thread pool (NumPy releases the GIL).
+    Returns per-region peaks and totals, shape (R, S), and the system-wide
+    peak (max over days of the summed regional demand), shape (S,).
+    """
+    coef = np.stack([models[r].coef for r in models])  # (R, 9)
+    # Intercept plus day-of-week effect for every region and day (Monday is the baseline)
+    dow = np.concatenate([np.zeros((len(coef), 1)), coef[:, 3:9]], axis=1)
+    fixed = coef[:, 0:1] + np.take_along_axis(dow, weekdays, axis=1)  # (R, D)
+    b1 = coef[:, 1, None, None]
+    b2 = coef[:, 2, None, None]
+
+    n_regions, horizon = base.shape
+    n_scenarios = len(perturbations)
+    chunk = max(1, chunk_bytes // (8 * n_regions * horizon * 3))
+
+    peak = np.empty((n_regions, n_scenarios))
+    total = np.empty((n_regions, n_scenarios))
+    system_peak = np.empty(n_scenarios)
+
+    def run_chunk(first):
+        last = min(first + chunk, n_scenarios)
+        temps = base[:, None, :] + perturbations[None, first:last, :]  # (R, s, D)
+        demand = fixed[:, None, :] + b1 * temps + b2 * temps ** 2
+        peak[:, first:last] = demand.max(axis=2)
+        total[:, first:last] = demand.sum(axis=2)
+        system_peak[first:last] = demand.sum(axis=0).max(axis=1)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(run_chunk, range(0, n_scenarios, chunk)))
+
+    return peak, total, system_peak
+
+
+def summarize_peaks(regions, peak, system_peak, quantiles=(0.05, 0.5, 0.95)) -> pd.DataFrame:
+    """
+    Peak-demand distribution across scenarios per region and for the whole system.
+    """
+    values = np.vstack([peak, system_peak[None, :]])
+    table = pd.DataFrame(np.quantile(values, quantiles, axis=1).T, columns=[f"p{int(q * 100)}" for q in quantiles])
+    table.insert(0, "region", list(regions) + ["All regions"])
+    table["mean"] = values.mean(axis=1)
+    table["max"] = values.max(axis=1)
+    return table
+
+
+def run_scenarios(dataset_entry: dict, deltas_f=(0.0, 5.0), n_paths=0, horizon=7, noise_f=3.0, seed=0, max_workers=4,
+                  store: SeriesStore = None):
+    """
+    Evaluates the scenario grid with the dataset version's registered models,
+    the same ones the forecast server uses. `store` may be passed when the
+    dataset is already loaded.
+    Returns (summary table, per-region peaks (R, S), system peaks (S,), regions).
+    """
+    store = load_training_store(dataset_entry) if store is None else store
+    models = models_for_dataset(dataset_entry, TemperatureRegressionModel.name, store=store)
+    if not models:
+        logger.warning("No region has enough data for scenario simulation.")
+        return pd.DataFrame(), np.empty((0, 0)), np.empty(0), []
+
+    perturbations = scenario_grid(deltas_f, n_paths, horizon, noise_f, seed=seed)
+    regions, base, weekdays = baseline_paths(store, models, horizon)
+    peak, _, system_peak = simulate(models, base, weekdays, perturbations, max_workers=max_workers)
+
+    logger.info(f"Simulated {len(regions)} regions × {len(perturbations)} scenarios × {horizon} days.")
+    return summarize_peaks(regions, peak, system_peak), peak, system_peak, regions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Weather sensitivity scenarios for every region")
+    parser.add_argument("--deltas", nargs="+", type=float, default=[-5.0, 0.0, 5.0], help="Temperature shifts in °F")
+    parser.add_argument("--paths", type=int, default=1000, help="Synthetic weather paths per shift")
+    parser.add_argument("--horizon", type=int, default=7)
+    parser.add_argument("--noise", type=float, default=3.0, help="Daily noise of synthetic paths in °F")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    ensure_catalog()
+    dataset = current_dataset()
+    if dataset is None:
+        logger.error("No processed dataset registered; nothing to simulate.")
+        sys.exit(1)
+
+    summary, *_ = run_scenarios(dataset, args.deltas, args.paths, args.horizon, args.noise, args.seed)
+    print(summary.to_string(index=False))
@@ -0,0 +1,245 @@
+# Local forecast serving API
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import time
+import argparse
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+from pipeline.config import CITY_CONFIG
+from pipeline.catalog import CATALOG_PATH, load_catalog, current_dataset, ensure_catalog
+from forecasting.models import models_for_dataset
+from common.loggerInfo import get_logger
+
+logger = get_logger("forecast_server")
+
+MAX_HORIZON = 30
+
+
+class ForecastService:
+    """
+    Holds the per-region models for the current dataset version and an in-memory
+    cache of forecasts. Both are dropped as soon as the catalog's current
+    dataset changes, so results are reused until new data lands.
+    Each request works on one (version, models, cache) snapshot, so a request
+    that started before a refresh can only fill the old version's cache.
+    """
+
+    def __init__(self, model_name="temperature_regression"):
+        self.model_name = model_name
+        self.lock = threading.Lock()
+        self.catalog_mtime = None
+        self.version = None
+        self.models = {}
+        self.cache = {}
+
+    def refresh(self):
+        # A stat per request is enough to notice a new catalog; the JSON is only re-read when it changed
+        mtime = os.path.getmtime(CATALOG_PATH) if os.path.exists(CATALOG_PATH) else None
+        if mtime == self.catalog_mtime:
+            return
+        with self.lock:
+            if mtime == self.catalog_mtime:
+                return
+            catalog = load_catalog()
+            dataset = current_dataset(catalog)
+            if dataset is not None and catalog["current"] != self.version:
+                self.models = models_for_dataset(dataset, self.model_name)
+                self.version = catalog["current"]
+                self.cache = {}
+                logger.info(f"Serving {self.model_name} models for dataset version {self.version}.")
+            self.catalog_mtime = mtime
+
+    def snapshot(self):
+        """
+        (version, models, cache) as of the latest refresh, taken together.
+        """
+        self.refresh()
+        with self.lock:
+            return self.version, self.models, self.cache
+
+    def forecast(self, region, horizon, snapshot=None):
+        version, models, cache = snapshot or self.snapshot()
+        key = (region, horizon)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+        model = models.get(region)
+        if model is None:
+            raise KeyError(region)
+        dates, values = model.forecast(horizon)
+        result = {
+            "region": region,
+            "dataset_version": version,
+            "model": self.model_name,
+            "forecast": [{"date": str(d), "energy_consumption": float(v)} for d, v in zip(dates, values)],
+        }
+        cache[key] = result
+        return result
+
+
+class LatencyMetrics:
+    """
+    Request counts and a rolling window of latencies per endpoint.
+    """
+
+    def __init__(self, window=10000):
+        self.lock = threading.Lock()
+        self.window = window
+        self.started = time.time()
+        self.latencies = {}
+        self.counts = {}
+        self.errors = {}
+
+    def record(self, endpoint, seconds, ok):
+        with self.lock:
+            self.latencies.setdefault(endpoint, deque(maxlen=self.window)).append(seconds)
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def snapshot(self):
+        with self.lock:
+            uptime = time.time() - self.started
+            report = {"uptime_seconds": uptime, "endpoints": {}}
+            for endpoint, samples in self.latencies.items():
+                ms = np.fromiter(samples, dtype="float64") * 1000
+                report["endpoints"][endpoint] = {
+                    "requests": self.counts[endpoint],
+                    "errors": self.errors.get(endpoint, 0),
+                    "throughput_rps": self.counts[endpoint] / uptime,
+                    "p50_ms": float(np.percentile(ms, 50)),
+                    "p95_ms": float(np.percentile(ms, 95)),
+                    "p99_ms": float(np.percentile(ms, 99)),
+                }
+            return report
+
+
+def make_handler(service: ForecastService, metrics: LatencyMetrics):
+
+    class ForecastHandler(BaseHTTPRequestHandler):
+        """
+        GET  /forecast?region=Chicago&horizon=7
+        POST /forecast/batch  {"regions": ["Chicago", ...], "horizon": 7}
+        GET  /metrics
+        GET  /health
+        """
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _timed(self, endpoint, handler):
+            started = time.perf_counter()
+            status = 500
+            try:
+                status, payload = handler()
+            except Exception as e:
+                logger.error(f"Error serving {endpoint}: {e}")
+                payload = {"error": str(e)}
+            self._send(status, payload)
+            metrics.record(endpoint, time.perf_counter() - started, status < 400)
+
+        def _parse_horizon(self, value):
+            try:
+                horizon = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"horizon must be an integer, got {value!r}")
+            if not 1 <= horizon <= MAX_HORIZON:
+                raise ValueError(f"horizon must be between 1 and {MAX_HORIZON}")
+            return horizon
+
+        def _single(self, query):
+            region = query.get("region", [None])[0]
+            if not region:
+                return 400, {"error": "region is required"}
+            try:
+                horizon = self._parse_horizon(query.get("horizon", ["1"])[0])
+            except ValueError as e:
+                return 400, {"error": str(e)}
+
+            # Taken outside the error handling: a failure to load the models is a server error, not a bad request
+            snapshot = service.snapshot()
+            try:
+                return 200, service.forecast(region, horizon, snapshot)
+            except KeyError:
+                return 404, {"error": f"unknown region: {region}"}
+
+        def _batch(self):
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not isinstance(request, dict):
+                    raise ValueError("request body must be a JSON object")
+                horizon = self._parse_horizon(request.get("horizon", 1))
+                regions = request.get("regions") or list(CITY_CONFIG)
+                if not isinstance(regions, list) or not all(isinstance(r, str) for r in regions):
+                    raise ValueError("regions must be a list of region names")
+            except ValueError as e:
+                return 400, {"error": str(e)}
+
+            # The whole batch is answered from one dataset version
+            snapshot = service.snapshot()
+            results, errors = [], {}
+            for region in regions:
+                try:
+                    results.append(service.forecast(region, horizon, snapshot))
+                except KeyError:
+                    errors[region] = "unknown region"
+            return 200, {"forecasts": results, "errors": errors}
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/forecast":
+                self._timed("forecast", lambda: self._single(parse_qs(url.query)))
+            elif url.path == "/metrics":
+                self._send(200, metrics.snapshot())
+            elif url.path == "/health":
+                self._send(200, {"status": "ok", "dataset_version": service.version})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if urlparse(self.path).path == "/forecast/batch":
+                self._timed("forecast_batch", self._batch)
+            else:
+                self._send(404, {"error": "not found"})
+
+        def log_message(self, format, *args):
+            # Per-request access logs would dominate latency under load
+            pass
+
+    return ForecastHandler
+
+
+def run_server(host="127.0.0.1", port=8080, model_name="temperature_regression"):
+    ensure_catalog()
+    service = ForecastService(model_name)
+    service.refresh()  # Load or fit models before accepting traffic
+    server = ThreadingHTTPServer((host, port), make_handler(service, LatencyMetrics()))
+    logger.info(f"Forecast server listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Forecast server stopped.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve per-region demand forecasts over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--model", default="temperature_regression", help="Model from forecasting.models.MODEL_REGISTRY")
+    args = parser.parse_args()
+
+    run_server(args.host, args.port, args.model)
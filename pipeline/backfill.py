@@ -0,0 +1,216 @@
+# Resumable multi-year backfill
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# %%
+import json
+import time
+import argparse
+import threading
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from pipeline.config import CITY_CONFIG
+from fetch_energy import fetch_energy_data
+from fetch_weather import fetch_weather_data, NOAA_MAX_WINDOW_DAYS
+from transform import merge_weather_and_energy, add_features
+from save import save_data, save_raw_data
+from pipeline.raw_archive import read_raw
+from common.fileio import write_json_atomic
+from common.loggerInfo import get_logger
+from quality.quality_dashboard import run_quality_checks
+
+# %%
+
+logger = get_logger("backfill")
+
+MANIFEST_PATH = "data/backfill/manifest.json"
+
+# Window length per provider. NOAA allows at most one year per request;
+# EIA daily region data returns ~20 rows per respondent and day, so 240 days
+# stays within a single 5000-row page.
+WINDOW_DAYS = {
+    "weather": NOAA_MAX_WINDOW_DAYS,
+    "energy": 240,
+}
+
+# Providers can take this long to publish a day (GHCND often lags a week), so
+# windows ending this close to today are archived but not checkpointed, and
+# are re-fetched by the next run until they have aged out of the lag
+PUBLICATION_LAG_DAYS = 7
+
+# Requests per second allowed per provider (NOAA documents 5/s per token)
+RATE_LIMITS = {
+    "weather": 5,
+    "energy": 5,
+}
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter spacing calls at least 1/rate seconds apart.
+    """
+
+    def __init__(self, rate_per_second):
+        self.interval = 1.0 / rate_per_second
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        time.sleep(max(0.0, slot - now))
+
+
+def split_windows(start_date, end_date, window_days):
+    """
+    Splits [start_date, end_date] into consecutive inclusive windows of at most window_days.
+    """
+    windows = []
+    window_start = start_date
+    while window_start <= end_date:
+        window_end = min(window_start + timedelta(days=window_days - 1), end_date)
+        windows.append((window_start, window_end))
+        window_start = window_end + timedelta(days=1)
+    return windows
+
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {"completed": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    write_json_atomic(path, manifest)
+
+
+def unit_key(city, source, window_start, window_end):
+    return f"{city}|{source}|{window_start.isoformat()}|{window_end.isoformat()}"
+
+
+def fetch_unit(city, source, window_start, window_end, limiter=None):
+    """
+    Fetches one (city, source, window) unit from its provider. Every page
+    request waits on the limiter; request errors are raised, so an empty frame
+    means the provider has no data for the window.
+    """
+    codes = CITY_CONFIG[city]
+    if source == "weather":
+        return fetch_weather_data(
+            city, codes["station"], window_start.isoformat(), window_end.isoformat(), limiter=limiter, raise_errors=True
+        )
+    return fetch_energy_data(
+        codes["eia"], window_start.isoformat(), window_end.isoformat(), city, limiter=limiter, raise_errors=True
+    )
+
+
+def backfill(start_date, end_date, cities=None, max_workers=8, manifest_path=MANIFEST_PATH, build_dataset=True):
+    """
+    Loads [start_date, end_date] for the given cities into the raw archive,
+    window by window. Windows run concurrently within the provider rate limits
+    and every completed (city, source, window) unit is checkpointed to the
+    manifest, so rerunning the same command resumes an interrupted backfill.
+    Windows the provider has no data for are checkpointed with rows: 0. Windows
+    ending within PUBLICATION_LAG_DAYS of today, and units whose requests
+    failed, are left for the next run.
+    """
+    cities = cities or list(CITY_CONFIG)
+    manifest = load_manifest(manifest_path)
+    manifest_lock = threading.Lock()
+    # Appends to the same archive series must not interleave
+    archive_lock = threading.Lock()
+    limiters = {source: RateLimiter(rate) for source, rate in RATE_LIMITS.items()}
+
+    units = [
+        (city, source, window_start, window_end)
+        for city in cities
+        for source, window_days in WINDOW_DAYS.items()
+        for window_start, window_end in split_windows(start_date, end_date, window_days)
+    ]
+    pending = [u for u in units if unit_key(*u) not in manifest["completed"]]
+    logger.info(f"Backfill {start_date} to {end_date}: {len(units)} units, {len(units) - len(pending)} already done.")
+
+    def run_unit(city, source, window_start, window_end):
+        """
+        Returns (rows fetched, whether the unit was checkpointed).
+        """
+        df = fetch_unit(city, source, window_start, window_end, limiter=limiters[source])
+        if not df.empty:
+            with archive_lock:
+                save_raw_data(df, city, source, window_start.isoformat(), window_end.isoformat())
+        # The archive deduplicates, so re-fetching a recent window later only adds the days published since
+        if window_end > datetime.now().date() - timedelta(days=PUBLICATION_LAG_DAYS):
+            return len(df), False
+        with manifest_lock:
+            manifest["completed"][unit_key(city, source, window_start, window_end)] = {
+                "rows": len(df),
+                "completed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            save_manifest(manifest, manifest_path)
+        return len(df), True
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(run_unit, *unit): unit for unit in pending}
+        for future in as_completed(futures):
+            city, source, window_start, window_end = futures[future]
+            try:
+                rows, completed = future.result()
+            except Exception as e:
+                failed += 1
+                logger.error(f"Error backfilling {source} for {city} {window_start} to {window_end}: {e}")
+                logger.warning(f"{source} for {city} {window_start} to {window_end} not completed; it will be retried.")
+                continue
+            if not completed:
+                failed += 1
+                logger.warning(
+                    f"{source} for {city} {window_start} to {window_end} may not be fully published yet "
+                    f"({rows} rows so far); it will be re-fetched."
+                )
+            elif rows == 0:
+                logger.info(f"No {source} data for {city} {window_start} to {window_end}; recorded as completed.")
+
+    logger.info(f"Backfill pass finished: {len(pending) - failed} units completed, {failed} left for the next run.")
+
+    if build_dataset:
+        build_processed_dataset(start_date, end_date, cities)
+
+
+def build_processed_dataset(start_date, end_date, cities):
+    """
+    Rebuilds the merged, quality-checked dataset for the backfilled range from the raw archive.
+    """
+    all_data = []
+    for city in cities:
+        weather_df = read_raw(city, "weather", start_date, end_date)
+        energy_df = read_raw(city, "energy", start_date, end_date)
+        all_data.append(add_features(merge_weather_and_energy(weather_df, energy_df)))
+
+    final_df = pd.concat(all_data, ignore_index=True)
+    if final_df.empty:
+        logger.error("No archived data for the backfilled range.")
+        return
+    run_quality_checks(final_df)
+    save_data(final_df, historical=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resumable windowed backfill of weather and energy history")
+    parser.add_argument("--start", required=True, help="First date to load (YYYY-MM-DD)")
+    parser.add_argument("--end", default=None, help="Last date to load (YYYY-MM-DD), defaults to 2 days ago")
+    parser.add_argument("--cities", nargs="*", default=None, help="Subset of CITY_CONFIG cities")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent window fetches")
+    parser.add_argument("--no-dataset", action="store_true", help="Only fill the raw archive")
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start, "%Y-%m-%d").date()
+    end = datetime.strptime(args.end, "%Y-%m-%d").date() if args.end else datetime.now().date() - timedelta(days=2)
+
+    backfill(start, end, cities=args.cities, max_workers=args.workers, build_dataset=not args.no_dataset)
+
+# %%
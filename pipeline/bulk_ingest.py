@@ -0,0 +1,248 @@
+# Bulk-file ingestion for GHCN-Daily and EIA archives
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# %%
+import io
+import json
+import argparse
+import zipfile
+import pandas as pd
+from datetime import datetime
+from pipeline.config import CITY_CONFIG
+from save import save_raw_data
+from backfill import build_processed_dataset
+from transform import DEMAND_TYPE
+from common.loggerInfo import get_logger
+
+# %%
+
+logger = get_logger("bulk_ingest")
+
+WEATHER_ELEMENTS = ("TMAX", "TMIN")
+GHCN_MISSING = -9999
+
+# GHCN-Daily by-year CSV columns (the files have no header)
+GHCN_CSV_COLUMNS = ["station", "date", "element", "value", "mflag", "qflag", "sflag", "obs_time"]
+
+
+def _ghcn_station_cities():
+    # CITY_CONFIG stores CDO ids ("GHCND:USW00094728"); the bulk files use the bare station id
+    return {codes["station"].split(":", 1)[-1]: city for city, codes in CITY_CONFIG.items()}
+
+
+def _eia_respondent_cities():
+    return {codes["eia"]: city for city, codes in CITY_CONFIG.items()}
+
+
+def _weather_frame(records, city):
+    """
+    Pivots (date, element, value) records into fetch_weather_data's [date, city, TMAX, TMIN].
+    """
+    df = pd.DataFrame(records, columns=["date", "datatype", "value"])
+    df_pivot = df.pivot_table(index="date", columns="datatype", values="value", aggfunc="first").reset_index()
+    for element in WEATHER_ELEMENTS:
+        if element not in df_pivot.columns:
+            df_pivot[element] = float("nan")
+    df_pivot["date"] = pd.to_datetime(df_pivot["date"]).dt.date
+    df_pivot["city"] = city
+    return df_pivot[["date", "city", "TMAX", "TMIN"]]
+
+
+def read_ghcn_dly(path, start_date=None, end_date=None) -> dict:
+    """
+    Streams a GHCN-Daily .dly file (one station-month-element per fixed-width line)
+    and returns {city: weather frame} for the stations in CITY_CONFIG.
+    Values that failed NOAA's quality control (non-blank Q flag) are dropped.
+    """
+    station_cities = _ghcn_station_cities()
+    records = {}
+
+    with open(path) as f:
+        for line in f:
+            station, element = line[0:11], line[17:21]
+            if element not in WEATHER_ELEMENTS or station not in station_cities:
+                continue
+            year, month = int(line[11:15]), int(line[15:17])
+            for day in range(31):
+                base = 21 + day * 8
+                value, qflag = int(line[base:base + 5]), line[base + 6:base + 7]
+                if value == GHCN_MISSING or qflag.strip():
+                    continue
+                try:
+                    date = datetime(year, month, day + 1).date()
+                except ValueError:
+                    continue  # Day 31 of a 30-day month etc.
+                if (start_date and date < start_date) or (end_date and date > end_date):
+                    continue
+                records.setdefault(station_cities[station], []).append((date, element, float(value)))
+
+    return {city: _weather_frame(rows, city) for city, rows in records.items()}
+
+
+def read_ghcn_by_year(path, start_date=None, end_date=None, chunksize=1_000_000) -> dict:
+    """
+    Reads a GHCN-Daily by-year CSV (optionally .gz) in chunks, keeping only
+    TMAX/TMIN rows for the stations in CITY_CONFIG.
+    Returns {city: weather frame}.
+    """
+    station_cities = _ghcn_station_cities()
+    kept = []
+
+    chunks = pd.read_csv(
+        path, header=None, names=GHCN_CSV_COLUMNS, usecols=["station", "date", "element", "value", "qflag"],
+        dtype={"station": str, "date": str, "element": str, "value": "int32", "qflag": str}, chunksize=chunksize,
+    )
+    for chunk in chunks:
+        chunk = chunk[chunk["station"].isin(station_cities) & chunk["element"].isin(WEATHER_ELEMENTS) & chunk["qflag"].isna()]
+        if not chunk.empty:
+            kept.append(chunk)
+
+    if not kept:
+        return {}
+
+    rows = pd.concat(kept, ignore_index=True)
+    rows["date"] = pd.to_datetime(rows["date"], format="%Y%m%d")
+    if start_date:
+        rows = rows[rows["date"] >= pd.Timestamp(start_date)]
+    if end_date:
+        rows = rows[rows["date"] <= pd.Timestamp(end_date)]
+
+    return {
+        station_cities[station]: _weather_frame(
+            list(station_rows[["date", "element", "value"]].astype({"value": "float64"}).itertuples(index=False, name=None)),
+            station_cities[station],
+        )
+        for station, station_rows in rows.groupby("station")
+    }
+
+
+def _iter_eia_lines(path):
+    """
+    Yields lines from an EIA bulk file: a .zip holding the JSON-lines file, or the JSON-lines file itself.
+    """
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for name in archive.namelist():
+                with archive.open(name) as f:
+                    yield from io.TextIOWrapper(f, encoding="utf-8")
+    else:
+        with open(path, encoding="utf-8") as f:
+            yield from f
+
+
+def read_eia_bulk(path, start_date=None, end_date=None) -> dict:
+    """
+    Streams an EIA bulk file (e.g. EBA.zip) and returns {city: energy frame} in
+    fetch_energy_data's [date, city, reg_id, type, timezone, energy_consumption]
+    schema for the respondents in CITY_CONFIG.
+    Only hourly demand in local time (EBA.{respondent}-ALL.D.HL) is read. It is
+    summed per local day, so each row lands on the same archive key as the API's
+    daily demand in the respondent's timezone (type "D", CITY_CONFIG timezone).
+    Days with missing hours are dropped rather than stored as partial totals.
+    """
+    respondent_cities = _eia_respondent_cities()
+    series_ids = {f"EBA.{respondent}-ALL.{DEMAND_TYPE}.HL": respondent for respondent in respondent_cities}
+    start_key = start_date.strftime("%Y%m%d") if start_date else None
+    end_key = end_date.strftime("%Y%m%d") if end_date else None
+    frames = {}
+
+    for line in _iter_eia_lines(path):
+        # Cheap substring test before paying for json.loads on every other series
+        if not any(f'"{series_id}"' in line for series_id in series_ids):
+            continue
+        series = json.loads(line)
+        respondent = series_ids.get(series.get("series_id", ""))
+        if respondent is None:
+            continue
+
+        data = pd.DataFrame(series.get("data", []), columns=["period", "value"]).dropna(subset=["value"])
+        # Periods are hour-ending local times with their UTC offset ("20200101T01-05");
+        # the hour ending at T00 belongs to the previous day
+        periods = data["period"].astype(str)
+        hour_ending = pd.to_datetime(periods.str[:11], format="%Y%m%dT%H")
+        data["offset"] = periods.str[11:14].astype(int)
+        data["day"] = (hour_ending - pd.Timedelta(hours=1)).dt.strftime("%Y%m%d")
+        if start_key:
+            data = data[data["day"] >= start_key]
+        if end_key:
+            data = data[data["day"] <= end_key]
+
+        data = data.assign(utc=hour_ending - pd.to_timedelta(data["offset"], unit="h")).sort_values("utc")
+        daily = data.groupby("day").agg(
+            sum=("value", "sum"), count=("value", "count"),
+            first_offset=("offset", "first"), last_offset=("offset", "last"),
+        ).reset_index()
+        # A local day is 24 hours less the change in UTC offset across it: 23 when
+        # clocks spring forward (-05 to -04), 25 when they fall back
+        expected = 24 - (daily["last_offset"] - daily["first_offset"])
+        daily = daily[daily["count"] == expected]
+        if daily.empty:
+            continue
+
+        city = respondent_cities[respondent]
+        frames[city] = pd.DataFrame({
+            "date": pd.to_datetime(daily["day"], format="%Y%m%d").dt.date,
+            "city": city,
+            "reg_id": respondent,
+            "type": DEMAND_TYPE,
+            "timezone": CITY_CONFIG[city]["timezone"],
+            "energy_consumption": daily["sum"].astype(float),
+        }).sort_values("date", kind="mergesort").reset_index(drop=True)
+
+    return frames
+
+
+def ingest_bulk(ghcn_paths=(), eia_paths=(), start_date=None, end_date=None, build_dataset=False):
+    """
+    Loads local bulk archives into the raw archive, exactly as if the rows had
+    come from fetch_weather_data / fetch_energy_data, and optionally rebuilds
+    the processed dataset for the range.
+    """
+    for source, paths in (("weather", ghcn_paths), ("energy", eia_paths)):
+        for path in paths:
+            logger.info(f"Reading bulk {source} file {path}...")
+            if source == "energy":
+                frames = read_eia_bulk(path, start_date, end_date)
+            elif path.endswith(".dly"):
+                frames = read_ghcn_dly(path, start_date, end_date)
+            else:
+                frames = read_ghcn_by_year(path, start_date, end_date)
+
+            for city, df in frames.items():
+                save_raw_data(df, city, source, str(df["date"].min()), str(df["date"].max()))
+            if not frames:
+                logger.warning(f"No {source} rows for the configured cities in {path}.")
+
+    if build_dataset and start_date and end_date:
+        build_processed_dataset(start_date, end_date, list(CITY_CONFIG))
+
+
+def _expand(paths, suffix):
+    # A directory of .dly files is narrowed to the configured stations up front
+    expanded = []
+    for path in paths:
+        if os.path.isdir(path):
+            expanded += [os.path.join(path, f"{station}{suffix}") for station in _ghcn_station_cities()
+                         if os.path.exists(os.path.join(path, f"{station}{suffix}"))]
+        else:
+            expanded.append(path)
+    return expanded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest GHCN-Daily and EIA bulk files into the raw archive")
+    parser.add_argument("--ghcn", nargs="*", default=[], help=".dly files, a directory of .dly files, or by-year CSV(.gz) files")
+    parser.add_argument("--eia", nargs="*", default=[], help="EIA bulk EBA.zip or its JSON-lines file")
+    parser.add_argument("--start", default=None, help="First date to keep (YYYY-MM-DD)")
+    parser.add_argument("--end", default=None, help="Last date to keep (YYYY-MM-DD)")
+    parser.add_argument("--build", action="store_true", help="Rebuild the processed dataset for --start..--end")
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start, "%Y-%m-%d").date() if args.start else None
+    end = datetime.strptime(args.end, "%Y-%m-%d").date() if args.end else None
+
+    ingest_bulk(_expand(args.ghcn, ".dly"), args.eia, start, end, build_dataset=args.build)
+
+# %%
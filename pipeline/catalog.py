@@ -0,0 +1,151 @@
+# Processed-dataset catalog
+# %%
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import re
+import json
+import hashlib
+import pandas as pd
+from datetime import datetime
+from common.fileio import file_lock, write_json_atomic
+from common.loggerInfo import get_logger
+
+# %%
+
+logger = get_logger("catalog")
+
+PROCESSED_DIR = "data/processed"
+CATALOG_PATH = os.path.join(PROCESSED_DIR, "catalog.json")
+
+
+def load_catalog(path: str = CATALOG_PATH) -> dict:
+    """
+    Loads the catalog: {"version": n, "current": id, "datasets": {id: entry}}.
+    """
+    if not os.path.exists(path):
+        return {"version": 0, "current": None, "datasets": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_catalog(catalog: dict, path: str):
+    # Written to a temp file and renamed so readers never see a partial catalog
+    write_json_atomic(path, catalog)
+
+
+def file_checksum(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def register_dataset(path: str, df: pd.DataFrame, kind: str, make_current: bool = True, catalog_path: str = CATALOG_PATH) -> dict:
+    """
+    Records a fully written processed file as a new dataset version and,
+    by default, moves the "current" pointer to it. The read-modify-write runs
+    under a lock so concurrent registrations (e.g. a backfill and the daily
+    run) cannot hand out the same version.
+    Returns the catalog entry.
+    """
+    dates = pd.to_datetime(df["date"])
+    cities = {
+        city: {"min_date": str(city_dates.min().date()), "max_date": str(city_dates.max().date()), "rows": int(len(city_dates))}
+        for city, city_dates in dates.groupby(df["city"])
+    }
+
+    entry = {
+        "version": None,  # Assigned under the lock
+        "file": os.path.basename(path),
+        "kind": kind,
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "rows": int(len(df)),
+        "schema": {col: str(dtype) for col, dtype in df.dtypes.items()},
+        "cities": cities,
+        "sha256": file_checksum(path),
+    }
+
+    with file_lock(f"{catalog_path}.lock"):
+        catalog = load_catalog(catalog_path)
+        version = catalog["version"] + 1
+        entry["version"] = version
+
+        catalog["version"] = version
+        catalog["datasets"][str(version)] = entry
+        if make_current:
+            catalog["current"] = str(version)
+        _save_catalog(catalog, catalog_path)
+
+    logger.info(f"Registered {entry['file']} as dataset version {version}.")
+    return entry
+
+
+def current_dataset(catalog: dict = None) -> dict:
+    """
+    Entry the "current" pointer refers to, or None if nothing is registered.
+    """
+    catalog = load_catalog() if catalog is None else catalog
+    if catalog["current"] is None:
+        return None
+    return catalog["datasets"][catalog["current"]]
+
+
+def dataset_path(entry: dict) -> str:
+    return os.path.join(PROCESSED_DIR, entry["file"])
+
+
+def verify_dataset(entry: dict) -> str:
+    """
+    Path of a catalogued file, after checking it still has the checksum recorded
+    at registration. Raises ValueError if the file was changed or truncated.
+    """
+    path = dataset_path(entry)
+    if file_checksum(path) != entry["sha256"]:
+        raise ValueError(f"{entry['file']} does not match the checksum recorded for dataset version {entry['version']}.")
+    return path
+
+
+def catalog_version(catalog: dict = None) -> int:
+    """
+    Monotonic catalog version; changes whenever a dataset is registered,
+    so caches can key off it instead of a TTL. Pass the catalog when the
+    current entry is read from the same load, so the two cannot disagree.
+    """
+    catalog = load_catalog() if catalog is None else catalog
+    return catalog["version"]
+
+
+def register_existing(processed_dir: str = PROCESSED_DIR):
+    """
+    One-time migration: registers processed CSVs written before the catalog existed,
+    oldest first, using the timestamp in their file names.
+    """
+    pattern = re.compile(r"^(?P<kind>historical|daily)_data_(?P<stamp>\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}(?:_\d+)?)\.csv$")
+    known = {entry["file"] for entry in load_catalog()["datasets"].values()}
+
+    files = sorted(
+        (match["stamp"], match["kind"], name)
+        for name in os.listdir(processed_dir)
+        if (match := pattern.match(name)) and name not in known
+    )
+    for _, kind, name in files:
+        path = os.path.join(processed_dir, name)
+        register_dataset(path, pd.read_csv(path), kind)
+
+
+def ensure_catalog():
+    """
+    Makes sure a catalog exists, migrating legacy files on first use.
+    """
+    if not os.path.exists(CATALOG_PATH) and os.path.isdir(PROCESSED_DIR):
+        logger.info("No dataset catalog found; registering existing processed files.")
+        register_existing()
+
+
+if __name__ == "__main__":
+    register_existing()
+
+# %%
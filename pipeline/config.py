@@ -16,12 +16,13 @@ EIA_API_KEY = os.getenv("EIA_API_KEYS")
 
 logger.info("Environment variables loaded.")
 
+# "timezone" is the EIA timezone facet whose daily totals are used for the respondent
 CITY_CONFIG = {
-    "New York": {"station": "GHCND:USW00094728", "eia": "NYIS"},
-    "Chicago": {"station": "GHCND:USW00094846", "eia": "PJM"},
-    "Houston": {"station": "GHCND:USW00012960", "eia": "ERCO"},
-    "Phoenix": {"station": "GHCND:USW00023183", "eia": "AZPS"},
-    "Seattle": {"station": "GHCND:USW00024233", "eia": "SCL"},
+    "New York": {"station": "GHCND:USW00094728", "eia": "NYIS", "timezone": "Eastern", "lat": 40.7128, "lon": -74.0060},
+    "Chicago": {"station": "GHCND:USW00094846", "eia": "PJM", "timezone": "Eastern", "lat": 41.8781, "lon": -87.6298},
+    "Houston": {"station": "GHCND:USW00012960", "eia": "ERCO", "timezone": "Central", "lat": 29.7604, "lon": -95.3698},
+    "Phoenix": {"station": "GHCND:USW00023183", "eia": "AZPS", "timezone": "Arizona", "lat": 33.4484, "lon": -112.0740},
+    "Seattle": {"station": "GHCND:USW00024233", "eia": "SCL", "timezone": "Pacific", "lat": 47.6062, "lon": -122.3321},
 }
 
 logger.info("City config loaded.")
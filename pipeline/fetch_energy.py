@@ -11,11 +11,20 @@ from common.loggerInfo import get_logger
 
 logger = get_logger("fetch_energy")
 
+# EIA API v2 returns at most 5000 rows per request
+EIA_PAGE_LIMIT = 5000
+
 
 
 # %%
 
-def fetch_energy_data(eia_station_id, start_date, end_date, city):
+def fetch_energy_data(eia_station_id, start_date, end_date, city, limiter=None, raise_errors=False):
+    """
+    Fetches daily EIA region data for a respondent, following the API's pages.
+    - limiter: optional object whose wait() is called before every request (see pipeline/backfill.py)
+    - raise_errors: re-raise request errors instead of returning an empty frame,
+      so callers can tell a failed request from a range without data
+    """
     energy_base_url = "https://api.eia.gov/v2/electricity/rto/daily-region-data/data/"
     
     params = {
@@ -24,17 +33,28 @@ def fetch_energy_data(eia_station_id, start_date, end_date, city):
         "data[]": "value",
         "facets[respondent][]": eia_station_id,  # e.g., "NYIS"
         "start": start_date,
-        "end": end_date
+        "end": end_date,
+        "length": EIA_PAGE_LIMIT,
     }
     
     try:
-        response = requests.get(energy_base_url, params=params)
-        response.raise_for_status()
+        results = []
+        offset = 0
+        while True:
+            if limiter is not None:
+                limiter.wait()
+            response = requests.get(energy_base_url, params={**params, "offset": offset})
+            response.raise_for_status()
+            logger.info(f"Response status code: {response}")
+            
+            # Extract the 'results' list from the JSON response, or return an empty list if not present
+            page = response.json().get("response", {}).get("data", [])
+            results.extend(page)
+            # A short page means there is nothing left to fetch
+            if len(page) < EIA_PAGE_LIMIT:
+                break
+            offset += EIA_PAGE_LIMIT
         logger.info(f"Successfully fetched energy data for {eia_station_id} from {start_date} to {end_date}.")
-        logger.info(f"Response status code: {response}")
-        
-        # Extract the 'results' list from the JSON response, or return an empty list if not present
-        results = response.json().get("response", {}).get("data", [])
         
         # converts the results into a pandas DataFrame
         df = pd.DataFrame(results)
@@ -59,12 +79,16 @@ def fetch_energy_data(eia_station_id, start_date, end_date, city):
         
         logger.info(f"Successfully fetched energy data for {eia_station_id} from {start_date} to {end_date}.")
         
-        return df[["date", "city", "reg_id", "energy_consumption"]]
+        # EIA returns one row per day for every type (D=demand, DF=forecast, NG=generation,
+        # TI=interchange) and timezone; both are kept so each row can be told apart
+        return df[["date", "city", "reg_id", "type", "timezone", "energy_consumption"]]
         
        
         
     except requests.exceptions.RequestException as e:
         logger.error(f"Error fetching energy data for {eia_station_id} from {start_date} to {end_date}: {e}")
+        if raise_errors:
+            raise
         return pd.DataFrame()
 # %%
 # if __name__ == "__main__":
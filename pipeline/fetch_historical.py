@@ -4,21 +4,33 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 # %%
+import argparse
 import pandas as pd
 from datetime import datetime, timedelta
 from pipeline.config import CITY_CONFIG
 from fetch_energy import fetch_energy_data
 from fetch_weather import fetch_weather_data
-from transform import merge_weather_and_energy
+from transform import merge_weather_and_energy, add_features
 from save import save_data, save_raw_data
 from common.loggerInfo import get_logger
 from quality.quality_dashboard import run_quality_checks
+from pipeline.parallel import run_city_stages_parallel
+from pipeline.memo import StageRunner
 
 # %%
 
 logger = get_logger("fetch_historical")
 
-def fetch_90_day_history():
+def fetch_90_day_history(parallel=False, max_workers=None, memoize=True):
+    """
+    Fetches the last 90 days for every city, then merges, checks and saves them.
+    With parallel=True the per-city merge, feature and quality stages run in a
+    process pool (see pipeline/parallel.py) instead of serially in this process.
+    Transform and save stages whose inputs are unchanged since an earlier run are
+    skipped (see pipeline/memo.py); quality checks always run.
+    """
+    runner = StageRunner(enabled=memoize)
+    
     # today = datetime.now().date()
     # end_date = today - timedelta(days=30)     # Avoid requesting today's data
     # start_date = end_date - timedelta(days=90)
@@ -27,24 +39,40 @@ def fetch_90_day_history():
     start_date = end_date - timedelta(days=90)
     
     all_data = []
+    raw_data = {}
     
     for city, codes in CITY_CONFIG.items():
         logger.info(f"Fetching data for {city}...")
         weather_df = fetch_weather_data(city, codes["station"], start_date.isoformat(), end_date.isoformat())
         energy_df = fetch_energy_data(codes["eia"], start_date, end_date, city)
-        merged_df = merge_weather_and_energy(weather_df, energy_df)
         
         save_raw_data(weather_df, city, "weather", start_date.isoformat(), end_date.isoformat())
         save_raw_data(energy_df, city, "energy", start_date, end_date)
         
-        all_data.append(merged_df)
-        
-    final_df = pd.concat(all_data, ignore_index=True)
-    run_quality_checks(final_df)  # Just run the checks
-    save_data(final_df, historical=True) # Save the actual data
+        if parallel:
+            raw_data[city] = (weather_df, energy_df)
+        else:
+            merged_df = runner.run(merge_weather_and_energy, weather_df, energy_df)
+            all_data.append(runner.run(add_features, merged_df))
+    
+    if parallel:
+        # Workers get the frames fetched above through staging files
+        final_df = run_city_stages_parallel(raw_data, max_workers=max_workers)
+    else:
+        final_df = pd.concat(all_data, ignore_index=True)
+        run_quality_checks(final_df)  # Just run the checks
+    runner.run(save_data, final_df, historical=True) # Save the actual data
+    runner.report()
+    runner.prune()
     
 if __name__ == "__main__":
-    fetch_90_day_history()
+    parser = argparse.ArgumentParser(description="Fetch 90 days of weather and energy history")
+    parser.add_argument("--parallel", action="store_true", help="Run per-city transform and quality stages in a process pool")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (defaults to the CPU count)")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute every stage even if its inputs are unchanged")
+    args = parser.parse_args()
+
+    fetch_90_day_history(parallel=args.parallel, max_workers=args.workers, memoize=not args.no_cache)
 
 
 # %%
@@ -13,9 +13,19 @@ from common.loggerInfo import get_logger
 
 logger = get_logger("fetch_weather")
 
+# NOAA CDO caps a single response at 1000 results (the default is only 25)
+# and a single request at one year of daily data.
+NOAA_PAGE_LIMIT = 1000
+NOAA_MAX_WINDOW_DAYS = 365
 
-def fetch_weather_data(city, station_id, start_date, end_date):
-    
+
+def fetch_weather_data(city, station_id, start_date, end_date, limiter=None, raise_errors=False):
+    """
+    Fetches daily TMAX/TMIN for a station, following NOAA's pages.
+    - limiter: optional object whose wait() is called before every request (see pipeline/backfill.py)
+    - raise_errors: re-raise request errors instead of returning an empty frame,
+      so callers can tell a failed request from a range without data
+    """
     weather_base_url = "https://www.ncei.noaa.gov/cdo-web/api/v2/data"
     params = {
         "datasetid": "GHCND",
@@ -23,17 +33,27 @@ def fetch_weather_data(city, station_id, start_date, end_date):
         "startdate": start_date,
         "enddate": end_date,
         "datatypeid": "TMAX,TMIN",
-        
+        "limit": NOAA_PAGE_LIMIT,
     }
     
     headers = {"token" : NOAA_API_KEY}
     try:
-        response = requests.get(weather_base_url, headers=headers, params=params)
-        response.raise_for_status()
+        results = []
+        offset = 1  # NOAA offsets are 1-based
+        while True:
+            if limiter is not None:
+                limiter.wait()
+            response = requests.get(weather_base_url, headers=headers, params={**params, "offset": offset})
+            response.raise_for_status()
+            logger.info(f"Response status code: {response}")
+            #Extract the 'results' list from the JSON response, or return an empty list if not present
+            page = response.json().get("results", [])
+            results.extend(page)
+            # A short page means there is nothing left to fetch
+            if len(page) < NOAA_PAGE_LIMIT:
+                break
+            offset += NOAA_PAGE_LIMIT
         logger.info(f"Successfully fetched weather data for {city} from {start_date} to {end_date}.")
-        logger.info(f"Response status code: {response}")
-        #Extract the 'results' list from the JSON response, or return an empty list if not present
-        results = response.json().get("results", [])
         
         # converts the results into a pandas DataFrame
         df = pd.DataFrame(results)
@@ -66,6 +86,8 @@ def fetch_weather_data(city, station_id, start_date, end_date):
             
     except requests.exceptions.RequestException as e:
         logger.error(f"Error fetching weather data for {city} from {start_date} to {end_date}: {e}")
+        if raise_errors:
+            raise
         return pd.DataFrame()
         
         
@@ -0,0 +1,200 @@
+# Content-hash memoization of pipeline stages
+# %%
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import time
+import pickle
+import inspect
+import importlib
+import hashlib
+import datetime
+import numpy as np
+import pandas as pd
+from common.fileio import file_lock, write_json_atomic
+from common.loggerInfo import get_logger
+
+# %%
+
+logger = get_logger("memo")
+
+STAGE_CACHE_DIR = "data/cache/stages"
+
+# Stored outputs are kept while one of the last KEEP_RUNS runs used them.
+# Pruning by run rather than by count per stage keeps every city's output of a
+# per-city stage, however many regions there are.
+KEEP_RUNS = 5
+
+
+def stage(name, inputs=None, version="1", validate=None, depends=()):
+    """
+    Marks a function as a memoizable pipeline stage. Only pure stages belong
+    here: the output must follow from the declared inputs and the code, and a
+    cache hit skips the call entirely, side effects included.
+    - inputs: names of the arguments its output depends on (all arguments if omitted)
+    - version: bump when behaviour changes in code the key does not cover
+    - validate: optional check on a stored output before it is reused
+      (e.g. that a file written by the stage still exists)
+    - depends: names of further modules whose source is part of the key
+      (the function's own module always is)
+    The function itself is returned unchanged.
+    """
+    def decorate(func):
+        func.stage_name = name
+        func.stage_inputs = inputs
+        func.stage_version = version
+        func.stage_validate = validate
+        func.stage_depends = tuple(depends)
+        return func
+    return decorate
+
+
+def fingerprint(value, sha=None):
+    """
+    Content hash of a stage input: frames are hashed by their values, index,
+    columns and dtypes; containers recursively; everything else by its repr.
+    """
+    sha = sha or hashlib.sha256()
+    if isinstance(value, pd.DataFrame):
+        sha.update(json.dumps([list(map(str, value.columns)), list(map(str, value.dtypes))]).encode())
+        sha.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, pd.Series):
+        sha.update(str(value.dtype).encode())
+        sha.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, np.ndarray):
+        sha.update(str(value.dtype).encode())
+        sha.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        for key in sorted(value, key=str):
+            sha.update(repr(key).encode())
+            fingerprint(value[key], sha)
+    elif isinstance(value, (list, tuple)):
+        sha.update(f"{type(value).__name__}:{len(value)}".encode())
+        for item in value:
+            fingerprint(item, sha)
+    elif isinstance(value, (datetime.date, datetime.datetime)):
+        sha.update(value.isoformat().encode())
+    else:
+        sha.update(repr(value).encode())
+    return sha
+
+
+def code_version(func) -> str:
+    """
+    Hash of the source of the stage's whole module (so edits to helpers it calls
+    there invalidate it too), of any declared dependency modules, and of the
+    declared version.
+    """
+    sha = hashlib.sha256()
+    for module in [inspect.getmodule(func)] + [importlib.import_module(name) for name in func.stage_depends]:
+        try:
+            sha.update(inspect.getsource(module).encode())
+        except (OSError, TypeError):
+            sha.update(f"{func.__module__}.{func.__qualname__}".encode())
+    sha.update(str(func.stage_version).encode())
+    return sha.hexdigest()
+
+
+class StageRunner:
+    """
+    Runs stages build-system style: a stage whose declared inputs and code are
+    unchanged since a previous run is skipped and its stored output reused.
+    Hits and misses are counted per stage. Call prune() once the run is done
+    to drop outputs no recent run has used.
+    """
+
+    def __init__(self, cache_dir=STAGE_CACHE_DIR, enabled=True):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self.stats = {}
+        # Whole seconds, so outputs written during the run never predate it on coarse-mtime filesystems
+        self.started = int(time.time())
+
+    def _key(self, func, args, kwargs, extra_inputs):
+        bound = inspect.signature(func).bind(*args, **kwargs)
+        bound.apply_defaults()
+        names = func.stage_inputs or list(bound.arguments)
+        declared = {name: bound.arguments[name] for name in names}
+        if extra_inputs:
+            declared["__extra__"] = extra_inputs
+
+        sha = fingerprint(declared)
+        sha.update(code_version(func).encode())
+        return sha.hexdigest()
+
+    def run(self, func, *args, extra_inputs=None, **kwargs):
+        """
+        Calls a @stage function, or returns its stored output if nothing changed.
+        extra_inputs adds data the stage depends on that is not passed as an argument.
+        """
+        name = func.stage_name
+        counts = self.stats.setdefault(name, {"hits": 0, "misses": 0})
+        if not self.enabled:
+            counts["misses"] += 1
+            return func(*args, **kwargs)
+
+        key = self._key(func, args, kwargs, extra_inputs)
+        stage_dir = os.path.join(self.cache_dir, name)
+        path = os.path.join(stage_dir, f"{key}.pkl")
+
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                output = pickle.load(f)
+            if func.stage_validate is None or func.stage_validate(output):
+                counts["hits"] += 1
+                logger.info(f"Stage {name}: inputs unchanged, reusing stored output.")
+                os.utime(path)  # Marks the output as used by this run
+                return output
+
+        counts["misses"] += 1
+        output = func(*args, **kwargs)
+
+        os.makedirs(stage_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(output, f)
+        os.replace(tmp_path, path)
+        return output
+
+    def prune(self):
+        """
+        Records this run and removes stored outputs that none of the last
+        KEEP_RUNS runs used (hits refresh an output's mtime, writes set it).
+        """
+        if not self.enabled or not os.path.isdir(self.cache_dir):
+            return
+        runs_path = os.path.join(self.cache_dir, "runs.json")
+        with file_lock(f"{runs_path}.lock"):
+            runs = []
+            if os.path.exists(runs_path):
+                with open(runs_path) as f:
+                    runs = json.load(f)
+            runs = sorted(runs + [self.started])[-KEEP_RUNS:]
+            write_json_atomic(runs_path, runs)
+            if len(runs) < KEEP_RUNS:
+                return
+
+            removed = 0
+            for name in os.listdir(self.cache_dir):
+                stage_dir = os.path.join(self.cache_dir, name)
+                if not os.path.isdir(stage_dir):
+                    continue
+                for f in os.listdir(stage_dir):
+                    path = os.path.join(stage_dir, f)
+                    if f.endswith(".pkl") and os.path.getmtime(path) < runs[0]:
+                        os.remove(path)
+                        removed += 1
+        if removed:
+            logger.info(f"Pruned {removed} stage outputs unused in the last {KEEP_RUNS} runs.")
+
+    def report(self):
+        """
+        Logs and returns the hit/miss counts per stage.
+        """
+        for name, counts in self.stats.items():
+            logger.info(f"Stage {name}: {counts['hits']} hits, {counts['misses']} misses.")
+        return self.stats
+
+# %%
@@ -0,0 +1,169 @@
+# Lightweight per-city, per-source metadata index maintained at write time
+# %%
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from pipeline.config import CITY_CONFIG
+from pipeline.raw_archive import read_raw, SOURCE_FACETS
+from common.fileio import file_lock, write_json_atomic
+from common.loggerInfo import get_logger
+
+# %%
+
+logger = get_logger("metadata_index")
+
+METADATA_INDEX_PATH = "data/metadata/index.json"
+
+
+def load_metadata_index(path: str = METADATA_INDEX_PATH) -> dict:
+    """
+    Loads the index: {city: {source: {min_date, max_date, rows, days, covered, gaps, day_rows, updated_at}}}.
+    "rows" counts observation rows as the fetchers and the processed files shape them
+    (one per day for weather and processed data, one per day and EIA series for energy),
+    each day counted once however often it was re-fetched; "day_rows" holds the
+    per-day counts as [start, end, rows per day] runs.
+    Returns an empty dict if nothing has been written yet.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_metadata_index(index: dict, path: str):
+    write_json_atomic(path, index)
+
+
+def _date_ranges(dates) -> list:
+    """
+    Collapses dates into sorted, inclusive [start, end] day ranges.
+    """
+    days = np.unique(pd.to_datetime(pd.Series(dates)).dropna().values.astype("datetime64[D]"))
+    if len(days) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(days).astype(np.int64) > 1)
+    starts = np.concatenate(([days[0]], days[breaks + 1]))
+    ends = np.concatenate((days[breaks], [days[-1]]))
+    return [[str(s), str(e)] for s, e in zip(starts, ends)]
+
+
+def _gaps(covered: list) -> list:
+    return [
+        [str((pd.Timestamp(prev_end) + pd.Timedelta(days=1)).date()), str((pd.Timestamp(next_start) - pd.Timedelta(days=1)).date())]
+        for (_, prev_end), (next_start, _) in zip(covered, covered[1:])
+    ]
+
+
+def _day_counts(dates) -> pd.Series:
+    """
+    Rows per day, indexed by datetime64[D] day.
+    """
+    days = pd.to_datetime(pd.Series(dates)).dropna().values.astype("datetime64[D]")
+    return pd.Series(days).value_counts().sort_index()
+
+
+def _count_runs(counts: pd.Series) -> list:
+    """
+    Collapses per-day counts into [start, end, rows per day] runs of consecutive days with equal counts.
+    """
+    if counts.empty:
+        return []
+    days = counts.index.values.astype("datetime64[D]")
+    values = counts.to_numpy()
+    breaks = np.flatnonzero((np.diff(days).astype(np.int64) > 1) | (np.diff(values) != 0))
+    starts = np.concatenate(([0], breaks + 1))
+    ends = np.concatenate((breaks, [len(days) - 1]))
+    return [[str(days[s]), str(days[e]), int(values[s])] for s, e in zip(starts, ends)]
+
+
+def _expand_runs(runs: list) -> pd.Series:
+    if not runs:
+        return pd.Series(dtype="int64")
+    return pd.concat([
+        pd.Series(int(n), index=pd.date_range(start, end, freq="D").values.astype("datetime64[D]"))
+        for start, end, n in runs
+    ])
+
+
+def _stored_counts(entry: dict) -> pd.Series:
+    if "day_rows" in entry:
+        return _expand_runs(entry["day_rows"])
+    # Entries written before per-day counts were kept: spread the recorded rows
+    # over the covered days (rebuild_metadata_index recomputes them exactly)
+    per_day = max(1, round(entry["rows"] / max(entry["days"], 1)))
+    return _expand_runs([[start, end, per_day] for start, end in entry["covered"]])
+
+
+def update_metadata(city: str, source: str, dates, replace: bool = False, path: str = METADATA_INDEX_PATH):
+    """
+    Records a write covering `dates` (one element per row written) for a city and source.
+    The rows of each day replace whatever an earlier write recorded for that day,
+    so overlapping re-fetches do not inflate the counts; other days are kept,
+    unless replace=True (used for sources where each write is a full snapshot,
+    e.g. processed data). The read-modify-write runs under a lock, so a
+    backfill and the daily run cannot lose each other's updates.
+    """
+    counts = _day_counts(dates)
+    if counts.empty:
+        return
+
+    with file_lock(f"{path}.lock"):
+        index = load_metadata_index(path)
+        entry = index.setdefault(city, {}).get(source)
+        if entry and not replace:
+            stored = _stored_counts(entry)
+            counts = pd.concat([stored[~stored.index.isin(counts.index)], counts]).sort_index()
+
+        covered = _date_ranges(counts.index)
+        index[city][source] = {
+            "min_date": covered[0][0],
+            "max_date": covered[-1][1],
+            "rows": int(counts.sum()),
+            "days": int(len(counts)),
+            "covered": covered,
+            "gaps": _gaps(covered),
+            "day_rows": _count_runs(counts),
+            "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        _save_metadata_index(index, path)
+
+
+def record_frame(df: pd.DataFrame, source: str, replace: bool = False, path: str = METADATA_INDEX_PATH):
+    """
+    Convenience wrapper recording every city in a frame with a date and city column.
+    """
+    if df.empty:
+        return
+    for city, city_df in df.groupby("city"):
+        update_metadata(city, source, city_df["date"], replace=replace, path=path)
+
+
+def rebuild_metadata_index(path: str = METADATA_INDEX_PATH):
+    """
+    Rebuilds the raw-source entries from the archive, e.g. after importing legacy files.
+    Entries for other sources (processed data) are kept.
+    """
+    with file_lock(f"{path}.lock"):
+        index = load_metadata_index(path)
+        for sources in index.values():
+            for source in SOURCE_FACETS:
+                sources.pop(source, None)
+        _save_metadata_index(index, path)
+
+    for city in CITY_CONFIG:
+        for source in SOURCE_FACETS:
+            df = read_raw(city, source)
+            if not df.empty:
+                update_metadata(city, source, df["date"], replace=True, path=path)
+    logger.info("Metadata index rebuilt from the raw archive.")
+
+
+if __name__ == "__main__":
+    rebuild_metadata_index()
+
+# %%
@@ -0,0 +1,136 @@
+# Process-pool execution of the per-city transform and quality stages
+# %%
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import shutil
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pipeline.transform import merge_weather_and_energy, add_features
+from quality.check_outliers import load_outlier_state, save_outlier_state
+from quality.quality_dashboard import run_city_quality_checks, write_city_quality_report
+from common.loggerInfo import get_logger
+
+# %%
+
+logger = get_logger("parallel")
+
+STAGING_DIR = "data/staging"
+
+# Numeric columns shipped back from workers as plain arrays
+ARRAY_COLUMNS = ["TMAX", "TMIN", "energy_consumption", "avg_temp"]
+
+
+def _write_city_arrays(df: pd.DataFrame, path: str):
+    """
+    Stores a city's merged frame as compact column arrays (.npz). City and
+    respondent are constant per city, so only dates and values are written.
+    """
+    np.savez(
+        path,
+        date=pd.to_datetime(df["date"]).values.astype("datetime64[D]"),
+        reg_id=np.array(df["reg_id"].iloc[0] if not df.empty else ""),
+        **{col: df[col].to_numpy(dtype="float64") for col in ARRAY_COLUMNS},
+    )
+
+
+def _read_city_arrays(path: str, city: str) -> pd.DataFrame:
+    with np.load(path) as arrays:
+        df = pd.DataFrame({"date": pd.to_datetime(arrays["date"]), "city": city})
+        df["TMAX"] = arrays["TMAX"]
+        df["TMIN"] = arrays["TMIN"]
+        df["reg_id"] = str(arrays["reg_id"])
+        df["energy_consumption"] = arrays["energy_consumption"]
+        df["avg_temp"] = arrays["avg_temp"]
+    return df
+
+
+def process_city(city: str, staging_dir: str, outlier_state: dict):
+    """
+    Worker task: merge, feature computation and quality checks for one city.
+    Reads the frames this run fetched from staging_dir and writes the merged
+    frame back there, so only paths and a small summary cross the process boundary.
+    Returns (city, staging path or None, quality summary, updated outlier state).
+    """
+    weather_df = pd.read_pickle(os.path.join(staging_dir, f"{city}_weather.pkl"))
+    energy_df = pd.read_pickle(os.path.join(staging_dir, f"{city}_energy.pkl"))
+    merged_df = add_features(merge_weather_and_energy(weather_df, energy_df))
+
+    if merged_df.empty:
+        return city, None, None, outlier_state
+
+    summary, outlier_state = run_city_quality_checks(merged_df, outlier_state)
+
+    path = os.path.join(staging_dir, f"{city}.npz")
+    _write_city_arrays(merged_df, path)
+    return city, path, summary, outlier_state
+
+
+# Not a memoized stage: the quality log, freshness report and outlier state it
+# writes must be produced on every run
+def run_city_stages_parallel(raw_frames: dict, max_workers=None) -> pd.DataFrame:
+    """
+    Runs process_city for every city in a process pool and combines the results:
+    merged frames are concatenated, quality summaries are written to the quality
+    log and the per-city outlier statistics are merged back into the shared state.
+    raw_frames maps each city to the (weather_df, energy_df) this run fetched;
+    they are handed to the workers through staging files, exactly as the serial
+    path merges them. Cities whose fetch came back empty are skipped.
+    """
+    run_dir = os.path.join(STAGING_DIR, datetime.now().strftime("%Y-%m-%d_%H-%M-%S"))
+    os.makedirs(run_dir, exist_ok=True)
+
+    cities = []
+    for city, (weather_df, energy_df) in raw_frames.items():
+        if weather_df.empty or energy_df.empty:
+            logger.warning(f"No freshly fetched data for {city}; skipping it in this run.")
+            continue
+        weather_df.to_pickle(os.path.join(run_dir, f"{city}_weather.pkl"))
+        energy_df.to_pickle(os.path.join(run_dir, f"{city}_energy.pkl"))
+        cities.append(city)
+
+    outlier_state = load_outlier_state()
+    frames, summaries = {}, {}
+
+    logger.info(f"Processing {len(cities)} cities with up to {max_workers or os.cpu_count()} workers...")
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = []
+        for city in cities:
+            # Each worker only gets its own city's slice of the outlier state
+            city_state = {
+                "watermarks": {k: v for k, v in outlier_state["watermarks"].items() if k == city},
+                "stats": {k: v for k, v in outlier_state["stats"].items() if k == city},
+            }
+            futures.append(pool.submit(process_city, city, run_dir, city_state))
+
+        for future in as_completed(futures):
+            try:
+                city, path, summary, city_state = future.result()
+            except Exception as e:
+                logger.error(f"Error processing city in worker: {e}")
+                continue
+
+            if path is None:
+                logger.warning(f"No merged data for {city}.")
+                continue
+
+            frames[city] = _read_city_arrays(path, city)
+            summaries[city] = summary
+            outlier_state["watermarks"].update(city_state["watermarks"])
+            outlier_state["stats"].update(city_state["stats"])
+
+    if summaries:
+        write_city_quality_report(summaries)
+        save_outlier_state(outlier_state)
+    shutil.rmtree(run_dir, ignore_errors=True)
+
+    if not frames:
+        return pd.DataFrame()
+
+    # Keep the serial pipeline's city order
+    return pd.concat([frames[c] for c in cities if c in frames], ignore_index=True)
+
+# %%
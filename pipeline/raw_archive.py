@@ -0,0 +1,365 @@
+# Deduplicated raw-data archive
+# %%
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import re
+import time
+import argparse
+import pandas as pd
+from pipeline.config import CITY_CONFIG
+from common.fileio import file_lock, write_json_atomic
+from common.loggerInfo import get_logger
+
+# %%
+
+logger = get_logger("raw_archive")
+
+ARCHIVE_DIR = "data/archive"
+
+# Each observation is stored once under this key. "type" and "timezone" tell
+# apart the several rows EIA returns for the same respondent and day (demand,
+# forecast, generation and interchange, each in several timezones); they are
+# empty for weather, which has one row per station and day.
+KEY_COLUMNS = ["source", "series_id", "date", "facet", "type", "timezone"]
+ARCHIVE_COLUMNS = KEY_COLUMNS + ["city", "value", "revision"]
+
+# Columns that carry the measured values for each raw source
+SOURCE_FACETS = {
+    "weather": ["TMAX", "TMIN"],
+    "energy": ["energy_consumption"],
+}
+
+# Columns of the fetcher frame that identify a row within a day, per raw source
+SOURCE_KEYS = {
+    "weather": [],
+    "energy": ["type", "timezone"],
+}
+
+# Compaction kicks in once a series has this many segments
+COMPACT_MIN_SEGMENTS = 4
+
+
+def series_id_for(city: str, source: str) -> str:
+    """
+    Returns the provider identifier a city's raw data is keyed by:
+    the NOAA station for weather, the EIA respondent for energy.
+    """
+    codes = CITY_CONFIG[city]
+    return codes["station"] if source == "weather" else codes["eia"]
+
+
+def _series_dir(source: str, series_id: str) -> str:
+    # Station ids contain ":" which is not a safe path character everywhere
+    safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", series_id)
+    return os.path.join(ARCHIVE_DIR, source, safe_id)
+
+
+def _lock_path(series_dir: str) -> str:
+    # Appends and compaction rewrite the series index, so both hold this lock
+    return os.path.join(series_dir, ".lock")
+
+
+def _load_series_index(series_dir: str) -> dict:
+    path = os.path.join(series_dir, "index.json")
+    if not os.path.exists(path):
+        return {"segments": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_series_index(series_dir: str, index: dict):
+    write_json_atomic(os.path.join(series_dir, "index.json"), index)
+
+
+def _to_long(df: pd.DataFrame, city: str, source: str) -> pd.DataFrame:
+    """
+    Reshapes a fetcher frame (wide, one column per facet) into archive rows.
+    """
+    keys = SOURCE_KEYS[source]
+    missing = [k for k in keys if k not in df.columns]
+    if missing:
+        raise ValueError(f"Raw {source} rows for {city} have no {', '.join(missing)} column; the archive keys on it.")
+
+    facets = [c for c in SOURCE_FACETS[source] if c in df.columns]
+    wide = df[["date"] + keys + facets].copy()
+    wide["date"] = pd.to_datetime(wide["date"]).dt.strftime("%Y-%m-%d")
+    for key in ("type", "timezone"):
+        wide[key] = wide[key].astype(str) if key in keys else ""
+
+    duplicated = wide.duplicated(subset=["date", "type", "timezone"], keep="last")
+    if duplicated.any():
+        logger.warning(f"Dropping {int(duplicated.sum())} duplicate raw {source} rows for {city}; the last one is kept.")
+        wide = wide[~duplicated]
+
+    long_df = wide.melt(id_vars=["date", "type", "timezone"], value_vars=facets, var_name="facet", value_name="value")
+    long_df["source"] = source
+    long_df["series_id"] = series_id_for(city, source)
+    long_df["city"] = city
+    return long_df
+
+
+def _latest_revisions(rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    Keeps only the newest revision of every key.
+    """
+    if rows.empty:
+        return rows
+    rows = rows.sort_values("revision", kind="mergesort")
+    return rows.drop_duplicates(subset=KEY_COLUMNS, keep="last")
+
+
+def _read_segment(series_dir: str, segment: dict):
+    """
+    Reads one segment file, or returns None if its rows cannot be keyed.
+    Segments written before rows were keyed on type/timezone carry a "seq"
+    ordinal instead: weather had a single row per day, so seq 0 maps onto the
+    empty keys, but energy ordinals were value-ranked and match no EIA facet.
+    """
+    rows = pd.read_csv(
+        os.path.join(series_dir, segment["file"]),
+        dtype={"series_id": str, "date": str, "type": str, "timezone": str},
+    )
+    if "seq" in rows.columns:
+        if (rows["source"] == "energy").any():
+            logger.warning(f"Skipping {segment['file']} in {series_dir}: energy rows without type/timezone keys. Re-fetch the range to replace them.")
+            return None
+        rows = rows.drop(columns="seq").assign(type="", timezone="")
+    return rows.fillna({"type": "", "timezone": ""})
+
+
+def _read_segments(series_dir: str, segments: list, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+    """
+    Reads the segments overlapping [start_date, end_date]; segments outside the
+    range are skipped using the min/max dates recorded in the series index.
+    """
+    frames = []
+    for segment in segments:
+        if start_date and segment["max_date"] < start_date:
+            continue
+        if end_date and segment["min_date"] > end_date:
+            continue
+        rows = _read_segment(series_dir, segment)
+        if rows is not None:
+            frames.append(rows)
+
+    if not frames:
+        return pd.DataFrame(columns=ARCHIVE_COLUMNS)
+
+    rows = pd.concat(frames, ignore_index=True)
+    if start_date:
+        rows = rows[rows["date"] >= start_date]
+    if end_date:
+        rows = rows[rows["date"] <= end_date]
+    return rows
+
+
+def append_raw(df: pd.DataFrame, city: str, source: str) -> int:
+    """
+    Appends the observations in a fetcher frame to the archive.
+    Only rows that are new, or whose value changed since the last stored
+    revision, are written, as a new append-only segment. The series lock is
+    held throughout, so a concurrent compaction cannot drop the new segment.
+    Returns the number of rows written.
+    """
+    if df.empty:
+        return 0
+
+    incoming = _to_long(df, city, source)
+    series_dir = _series_dir(source, incoming["series_id"].iloc[0])
+    os.makedirs(series_dir, exist_ok=True)
+    with file_lock(_lock_path(series_dir)):
+        return _append_locked(series_dir, incoming, city, source)
+
+
+def _append_locked(series_dir: str, incoming: pd.DataFrame, city: str, source: str) -> int:
+    index = _load_series_index(series_dir)
+
+    existing = _latest_revisions(
+        _read_segments(series_dir, index["segments"], incoming["date"].min(), incoming["date"].max())
+    )
+
+    if not existing.empty:
+        compared = incoming.merge(
+            existing[KEY_COLUMNS + ["value"]], on=KEY_COLUMNS, how="left", suffixes=("", "_stored"), indicator=True
+        )
+        is_new = compared["_merge"] == "left_only"
+        # NaN == NaN should count as unchanged (e.g. a TMIN NOAA never reported)
+        same_value = (compared["value"] == compared["value_stored"]) | (
+            compared["value"].isna() & compared["value_stored"].isna()
+        )
+        incoming = compared.loc[is_new | ~same_value, incoming.columns]
+
+    if incoming.empty:
+        logger.info(f"Archive already holds all raw {source} rows for {city}; nothing appended.")
+        return 0
+
+    revision = time.time_ns()
+    incoming = incoming.assign(revision=revision)[ARCHIVE_COLUMNS]
+    segment_file = f"segment_{revision}.csv"
+    incoming.to_csv(os.path.join(series_dir, segment_file), index=False)
+
+    index["segments"].append({
+        "file": segment_file,
+        "rows": len(incoming),
+        "min_date": incoming["date"].min(),
+        "max_date": incoming["date"].max(),
+    })
+    _save_series_index(series_dir, index)
+
+    logger.info(f"Appended {len(incoming)} raw {source} rows for {city} to {segment_file}.")
+    return len(incoming)
+
+
+def read_raw(city: str, source: str, start_date=None, end_date=None) -> pd.DataFrame:
+    """
+    Rebuilds a fetcher-shaped frame for a city and date range from the archive.
+    Weather comes back as [date, city, TMAX, TMIN], energy as
+    [date, city, reg_id, type, timezone, energy_consumption], matching
+    fetch_weather_data and fetch_energy_data.
+    """
+    series_id = series_id_for(city, source)
+    series_dir = _series_dir(source, series_id)
+
+    start_date = pd.to_datetime(start_date).strftime("%Y-%m-%d") if start_date is not None else None
+    end_date = pd.to_datetime(end_date).strftime("%Y-%m-%d") if end_date is not None else None
+
+    rows = pd.DataFrame(columns=ARCHIVE_COLUMNS)
+    if os.path.isdir(series_dir):
+        # Shared lock: a compaction must not delete segments between reading the index and the files
+        with file_lock(_lock_path(series_dir), shared=True):
+            index = _load_series_index(series_dir)
+            rows = _latest_revisions(_read_segments(series_dir, index["segments"], start_date, end_date))
+    if rows.empty:
+        logger.warning(f"No archived {source} data for {city} between {start_date} and {end_date}.")
+        return pd.DataFrame()
+
+    # Keys are unique after _latest_revisions, so a plain unstack is enough
+    wide = rows.set_index(["date", "type", "timezone", "facet"])["value"].unstack("facet")
+    wide = wide.reset_index().sort_values(["date", "type", "timezone"])
+    wide.columns.name = None
+    wide["date"] = pd.to_datetime(wide["date"]).dt.date
+    wide["city"] = city
+
+    for facet in SOURCE_FACETS[source]:
+        if facet not in wide.columns:
+            wide[facet] = float("nan")
+
+    if source == "weather":
+        return wide[["date", "city", "TMAX", "TMIN"]].reset_index(drop=True)
+
+    wide["reg_id"] = series_id
+    return wide[["date", "city", "reg_id", "type", "timezone", "energy_consumption"]].reset_index(drop=True)
+
+
+def _segment_years(segment: dict) -> range:
+    return range(int(segment["min_date"][:4]), int(segment["max_date"][:4]) + 1)
+
+
+def compact_series(source: str, series_id: str, min_segments: int = COMPACT_MIN_SEGMENTS) -> bool:
+    """
+    Folds the appended segments of one series into one segment per calendar
+    year, dropping superseded revisions, so range reads only open the years
+    they cover. Only the years the appended segments touch are rewritten.
+    Runs under the series lock, so appends from other processes wait for the
+    swap instead of racing it.
+    Segments that cannot be read with the current keys are left in place.
+    Returns True if the series was compacted.
+    """
+    series_dir = _series_dir(source, series_id)
+    if not os.path.isdir(series_dir):
+        return False
+
+    with file_lock(_lock_path(series_dir)):
+        index = _load_series_index(series_dir)
+        # Yearly segments written by an earlier compaction carry their "year"
+        appended = [segment for segment in index["segments"] if "year" not in segment]
+        if len(appended) < min_segments:
+            return False
+
+        years = {year for segment in appended for year in _segment_years(segment)}
+        frames, merged, kept = [], [], []
+        for segment in index["segments"]:
+            if years.isdisjoint(_segment_years(segment)):
+                kept.append(segment)
+                continue
+            rows = _read_segment(series_dir, segment)
+            if rows is None:
+                kept.append(segment)
+            else:
+                frames.append(rows)
+                merged.append(segment)
+        if not frames:
+            return False
+
+        rows = _latest_revisions(pd.concat(frames, ignore_index=True))
+        rows = rows.sort_values(["date", "facet", "type", "timezone"])[ARCHIVE_COLUMNS]
+
+        stamp = time.time_ns()
+        yearly = []
+        for year, year_rows in rows.groupby(rows["date"].str[:4], sort=True):
+            segment_file = f"segment_{stamp}_{year}.csv"
+            year_rows.to_csv(os.path.join(series_dir, segment_file), index=False)
+            yearly.append({
+                "file": segment_file,
+                "rows": len(year_rows),
+                "min_date": year_rows["date"].min(),
+                "max_date": year_rows["date"].max(),
+                "year": int(year),
+            })
+
+        # Swap the index first so readers never see a segment list with missing files
+        _save_series_index(series_dir, {"segments": kept + yearly})
+        for segment in merged:
+            os.remove(os.path.join(series_dir, segment["file"]))
+
+    logger.info(f"Compacted {len(merged)} segments of {source}/{series_id} into {len(yearly)} yearly segments ({len(rows)} rows).")
+    return True
+
+
+def compact_archive(min_segments: int = COMPACT_MIN_SEGMENTS):
+    """
+    Compaction pass over every configured city and source.
+    Meant to run in the background (see scheduler/run_scheduler.py).
+    """
+    logger.info("Compacting raw archive...")
+    for city in CITY_CONFIG:
+        for source in SOURCE_FACETS:
+            try:
+                compact_series(source, series_id_for(city, source), min_segments)
+            except Exception as e:
+                logger.error(f"Error compacting {source} archive for {city}: {e}")
+    logger.info("Raw archive compaction completed.")
+
+
+def import_legacy_raw(raw_dir: str = "data/raw"):
+    """
+    Seeds the archive from the per-run CSV files save_raw_data used to write
+    ({city}_{source}_{start}_to_{end}.csv). Overlapping files are deduplicated.
+    """
+    pattern = re.compile(r"^(?P<city>.+)_(?P<source>weather|energy)_\d{4}-\d{2}-\d{2}_to_\d{4}-\d{2}-\d{2}\.csv$")
+    for filename in sorted(os.listdir(raw_dir)):
+        match = pattern.match(filename)
+        if not match or match["city"] not in CITY_CONFIG:
+            continue
+        df = pd.read_csv(os.path.join(raw_dir, filename))
+        try:
+            append_raw(df, match["city"], match["source"])
+        except ValueError as e:
+            # Legacy energy files predate the type/timezone columns and cannot be keyed
+            logger.warning(f"Skipping {filename}: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Raw data archive maintenance")
+    parser.add_argument("command", choices=["compact", "import-legacy"])
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        compact_archive(min_segments=2)
+    else:
+        import_legacy_raw()
+
+# %%
@@ -8,12 +8,19 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 import os
 from datetime import datetime
 from common.loggerInfo import get_logger
+from pipeline.raw_archive import append_raw
+from pipeline.metadata_index import update_metadata, record_frame
+from pipeline.catalog import register_dataset
+from pipeline.memo import stage
+from common.fileio import reserve_path
 import pandas as pd
 
 # %%
 
 logger = get_logger("save")
 
+# A stored result is only reused while the file it points to still exists
+@stage("save_data", inputs=["df", "historical"], validate=lambda path: path is not None and os.path.exists(path))
 def save_data(df, historical=False):
     if df.empty:
         logger.error("No data to save.")
@@ -22,12 +29,24 @@ def save_data(df, historical=False):
     os.makedirs("data/processed", exist_ok=True)
     logger.info("Saving data...")
     date_str = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    filename = f"historical_data_{date_str}.csv" if historical else f"daily_data_{date_str}.csv"
-    path = os.path.join("data/processed", filename)
+    stem = f"historical_data_{date_str}" if historical else f"daily_data_{date_str}"
+    # Catalogued files are immutable, so a save in the same second gets its own name
+    path = reserve_path(os.path.join("data/processed", stem), ".csv")
     
-    # Save the DataFrame to a CSV file
-    df.to_csv(path, index=False)
+    # Save the DataFrame to a CSV file; written under a temp name and renamed
+    # so a reader can never pick up a half-written file
+    tmp_path = f"{path}.tmp"
+    try:
+        df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(path)  # Release the reserved name
+        raise
+    register_dataset(path, df, "historical" if historical else "daily")
+    # Each processed file is a full snapshot, so its coverage replaces the previous one
+    record_frame(df, "processed", replace=True)
     logger.info("Data saved successfully.")
+    return path
 # %%
 
 # ===========================
@@ -36,16 +55,16 @@ def save_data(df, historical=False):
 
 def save_raw_data(df: pd.DataFrame, city: str, source: str, start_date: str, end_date: str):
     """
-    Save raw API data (weather or energy) into /data/raw as CSV.
+    Save raw API data (weather or energy) into the deduplicated archive under /data/archive.
     - source: "weather" or "energy"
+    Observations already archived by an earlier, overlapping run are not written again.
     """
     if df.empty:
         logger.warning(f"No raw {source} data to save for {city}.")
         return
 
-    os.makedirs("data/raw", exist_ok=True)
-    filename = f"{city}_{source}_{start_date}_to_{end_date}.csv"
-    path = os.path.join("data/raw", filename)
-
-    df.to_csv(path, index=False)
-    logger.info(f"Raw {source} data saved for {city} at {path}.")
\ No newline at end of file
+    written = append_raw(df, city, source)
+    # The index counts observation rows (fetcher frame rows), like processed entries do,
+    # not the archive's per-facet values
+    update_metadata(city, source, df["date"])
+    logger.info(f"Raw {source} data archived for {city} ({start_date} to {end_date}): {len(df)} rows, {written} new values.")
@@ -6,18 +6,47 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 
 import pandas as pd
 from common.loggerInfo import get_logger
+from pipeline.config import CITY_CONFIG
+from pipeline.memo import stage
 
 logger = get_logger("transform")
 
+# EIA type code for actual demand (the other types are forecast, generation and interchange)
+DEMAND_TYPE = "D"
+
+
+def select_demand(energy_df):
+    """
+    Keeps one energy row per city and day: actual demand in the city's
+    configured EIA timezone (CITY_CONFIG[city]["timezone"]).
+    The type/timezone columns are dropped once the series is fixed.
+    """
+    if energy_df.empty:
+        return energy_df
+    if "type" not in energy_df.columns or "timezone" not in energy_df.columns:
+        logger.error("Energy data has no type/timezone columns; cannot tell demand from the other EIA series.")
+        return pd.DataFrame()
+
+    timezones = energy_df["city"].map(lambda city: CITY_CONFIG.get(city, {}).get("timezone"))
+    demand = energy_df[(energy_df["type"] == DEMAND_TYPE) & (energy_df["timezone"] == timezones)]
+    if demand.empty:
+        logger.warning("No demand rows in the configured timezone in the energy data.")
+    return demand.drop(columns=["type", "timezone"]).reset_index(drop=True)
+
+
+# select_demand reads each city's timezone from the config
+@stage("merge_weather_and_energy", inputs=["weather_df", "energy_df"], depends=["pipeline.config"])
 def merge_weather_and_energy(weather_df, energy_df):
     """
     Merges structured weather and energy dataframes on date and city.
+    Only the demand series is merged (see select_demand), giving one row per city and day.
     Returns a combined DataFrame with aligned rows for modeling.
     """
     if weather_df.empty:
         logger.error("Weather data is empty. Cannot perform merge.")
         return pd.DataFrame()
     
+    energy_df = select_demand(energy_df)
     if energy_df.empty:
         logger.error("Energy data is empty. Cannot perform merge.")
         return pd.DataFrame()
@@ -36,4 +65,15 @@ def merge_weather_and_energy(weather_df, energy_df):
     
     except Exception as e:
         logger.error(f"Error during merging: {e}")
-        return pd.DataFrame()
\ No newline at end of file
+        return pd.DataFrame()
+
+@stage("add_features", inputs=["merged_df"])
+def add_features(merged_df):
+    """
+    Adds the derived columns used downstream (dashboard, models) to a merged frame.
+    """
+    if merged_df.empty:
+        return merged_df
+
+    merged_df["avg_temp"] = (merged_df["TMAX"] + merged_df["TMIN"]) / 2
+    return merged_df
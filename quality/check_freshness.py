@@ -4,6 +4,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 
 import pandas as pd
 from common.loggerInfo import get_logger
+from pipeline.metadata_index import load_metadata_index
 from datetime import datetime, timedelta
 
 logger = get_logger("check_freshness")
@@ -34,3 +35,58 @@ def check_data_freshness(df: pd.DataFrame, freshness_threshold_days=2) -> bool:
     # Return True if it's older than the freshness threshold
     return days_old > freshness_threshold_days
     
+
+
+def check_freshness_by_city(store, freshness_threshold_days=2) -> pd.DataFrame:
+    """
+    Per-city freshness from a SeriesStore (common/series_store.py): the latest
+    day with data is read off each city's arrays instead of scanning the frame.
+    Returns one row per city with its latest date, age in days and a stale flag.
+    """
+    logger.info("Checking data freshness per city...")
+    today = pd.Timestamp(datetime.today().date())
+
+    rows = []
+    for city in store.cities:
+        offset = store[city].latest_offset()
+        latest_date = pd.Timestamp(store.dates[offset]) if offset >= 0 else pd.NaT
+        days_old = (today - latest_date).days if offset >= 0 else None
+        rows.append({
+            "city": city,
+            "latest_date": latest_date,
+            "days_old": days_old,
+            "is_stale": days_old is None or days_old > freshness_threshold_days,
+        })
+
+    return pd.DataFrame(rows)
+
+
+def check_freshness_from_index(index: dict = None, freshness_threshold_days=2) -> pd.DataFrame:
+    """
+    Per-city, per-source freshness and coverage read from the metadata index
+    (pipeline/metadata_index.py) that is maintained at write time, so no data is loaded.
+    Returns one row per city and source with its date range, age, stale flag and gaps.
+    """
+    logger.info("Checking data freshness from the metadata index...")
+    index = load_metadata_index() if index is None else index
+    today = pd.Timestamp(datetime.today().date())
+
+    rows = []
+    for city, sources in index.items():
+        for source, entry in sources.items():
+            days_old = (today - pd.Timestamp(entry["max_date"])).days
+            rows.append({
+                "city": city,
+                "source": source,
+                "min_date": entry["min_date"],
+                "max_date": entry["max_date"],
+                "days_old": days_old,
+                "is_stale": days_old > freshness_threshold_days,
+                "rows": entry["rows"],
+                "gap_count": len(entry["gaps"]),
+                "gap_days": sum((pd.Timestamp(end) - pd.Timestamp(start)).days + 1 for start, end in entry["gaps"]),
+                "gaps": entry["gaps"],
+            })
+
+    columns = ["city", "source", "min_date", "max_date", "days_old", "is_stale", "rows", "gap_count", "gap_days", "gaps"]
+    return pd.DataFrame(rows, columns=columns)
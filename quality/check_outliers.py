@@ -2,7 +2,9 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+import json
 import pandas as pd
+from common.fileio import write_json_atomic
 from common.loggerInfo import get_logger
 
 logger = get_logger("check_outliers")
@@ -29,4 +31,151 @@ def check_energy_outliers(df: pd.DataFrame) -> pd.DataFrame:
     Returns rows where consumption is below 0.
     """
     logger.info("Checking for energy outliers...")
-    return df[df['energy_consumption'] < 0]  # Negative usage doesn't make sense
\ No newline at end of file
+    return df[df['energy_consumption'] < 0]  # Negative usage doesn't make sense
+
+# ===========================
+# Incremental statistical outliers
+# ===========================
+
+# Running per-city, per-month statistics live in a small JSON file so each run
+# only has to look at the rows that arrived since the previous one.
+OUTLIER_STATE_PATH = "data/quality_reports/outlier_state.json"
+OUTLIER_METRICS = ["TMAX", "TMIN", "energy_consumption"]
+
+
+def load_outlier_state(path: str = OUTLIER_STATE_PATH) -> dict:
+    """
+    Loads the persisted detector state, or an empty one on first run.
+    Layout: {"watermarks": {city: last_date}, "stats": {city: {metric: {month: [count, mean, m2]}}}}
+    """
+    if not os.path.exists(path):
+        return {"watermarks": {}, "stats": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_outlier_state(state: dict, path: str = OUTLIER_STATE_PATH):
+    """
+    Writes the detector state atomically so an interrupted run never leaves a half-written file.
+    """
+    write_json_atomic(path, state)
+
+
+def _state_to_frame(state: dict) -> pd.DataFrame:
+    records = [
+        (city, metric, int(month), *values)
+        for city, metrics in state["stats"].items()
+        for metric, months in metrics.items()
+        for month, values in months.items()
+    ]
+    return pd.DataFrame(records, columns=["city", "metric", "month", "count", "mean", "m2"])
+
+
+def combine_stats(prior: pd.DataFrame, batch: pd.DataFrame) -> pd.DataFrame:
+    """
+    Chan's parallel form of Welford's update, per row: merges two sets of
+    count/mean/m2 columns aligned on the same groups. Missing prior groups
+    should be passed as count 0.
+    """
+    total = prior["count"] + batch["count"]
+    delta = batch["mean"] - prior["mean"]
+    safe_total = total.where(total > 0, 1)
+    return pd.DataFrame({
+        "count": total,
+        "mean": prior["mean"] + delta * batch["count"] / safe_total,
+        "m2": prior["m2"] + batch["m2"] + delta ** 2 * prior["count"] * batch["count"] / safe_total,
+    }, index=prior.index)
+
+
+def score_and_update_outliers(df: pd.DataFrame, state: dict, z_threshold: float = 4.0, min_count: int = 10):
+    """
+    Scores the rows newer than each city's watermark against the running
+    per-city, per-month mean/variance as it stood before this batch, then
+    folds them into the state. Groups without min_count prior observations
+    (e.g. a city's first batch) are scored against the prior and batch
+    statistics combined, so they are still checked; groups with fewer than
+    min_count observations even then are not flagged.
+    Returns (flagged rows, new state); the input state is left untouched.
+    """
+    state = {"watermarks": dict(state["watermarks"]), "stats": json.loads(json.dumps(state["stats"]))}
+    empty = pd.DataFrame(columns=["date", "city", "metric", "value", "zscore"])
+
+    metrics = [m for m in OUTLIER_METRICS if m in df.columns]
+    if df.empty or not metrics:
+        return empty, state
+
+    dates = pd.to_datetime(df["date"])
+    watermarks = pd.to_datetime(df["city"].map(state["watermarks"]))
+    new_rows = df.loc[watermarks.isna() | (dates > watermarks), ["date", "city"] + metrics].copy()
+    if new_rows.empty:
+        logger.info("No new rows since the last outlier check.")
+        return empty, state
+
+    new_rows["date"] = pd.to_datetime(new_rows["date"])
+    long_df = _to_long_metrics(new_rows, metrics)
+
+    # Per-group statistics of the new batch, aligned with the stored running statistics
+    keys = ["city", "metric", "month"]
+    grouped = long_df.groupby(keys)["value"]
+    batch = pd.DataFrame({"count": grouped.count(), "mean": grouped.mean(), "m2": grouped.var(ddof=0) * grouped.count()})
+    prior = _state_to_frame(state).set_index(keys).reindex(batch.index).fillna({"count": 0, "mean": 0.0, "m2": 0.0})
+    combined = combine_stats(prior, batch)
+
+    # Score against the prior statistics where there are enough of them, so the batch cannot mask its own outliers
+    has_prior = prior["count"] >= min_count
+    scoring = combined.copy()
+    scoring.loc[has_prior] = prior.loc[has_prior]
+    flagged = _flag(long_df, scoring.reset_index(), z_threshold, min_count)
+
+    # Persist the updated statistics and advance the watermarks
+    for row in combined.reset_index().itertuples(index=False):
+        state["stats"].setdefault(row.city, {}).setdefault(row.metric, {})[str(row.month)] = [
+            int(row.count), float(row.mean), float(row.m2)
+        ]
+    for city, last_date in new_rows.groupby("city")["date"].max().items():
+        state["watermarks"][city] = last_date.strftime("%Y-%m-%d")
+
+    logger.info(f"Scored {len(new_rows)} new rows for statistical outliers; {len(flagged)} values flagged.")
+    return flagged, state
+
+
+def _to_long_metrics(df: pd.DataFrame, metrics: list) -> pd.DataFrame:
+    rows = df[["date", "city"] + metrics].copy()
+    rows["date"] = pd.to_datetime(rows["date"])
+    rows["month"] = rows["date"].dt.month
+    return rows.melt(id_vars=["date", "city", "month"], value_vars=metrics, var_name="metric").dropna(subset=["value"])
+
+
+def _flag(long_df: pd.DataFrame, stats: pd.DataFrame, z_threshold: float, min_count: int) -> pd.DataFrame:
+    """
+    Vectorized scoring of long-format rows against per-(city, metric, month) count/mean/m2.
+    """
+    scored = long_df.merge(stats[["city", "metric", "month", "count", "mean", "m2"]], on=["city", "metric", "month"], how="left")
+    std = (scored["m2"] / scored["count"]).pow(0.5)
+    scored["zscore"] = ((scored["value"] - scored["mean"]) / std.where(std > 0)).abs()
+    flagged = scored[(scored["count"] >= min_count) & (scored["zscore"] > z_threshold)]
+    return flagged[["date", "city", "metric", "value", "zscore"]].reset_index(drop=True)
+
+
+def flag_statistical_outliers(df: pd.DataFrame, state: dict, z_threshold: float = 4.0, min_count: int = 10) -> pd.DataFrame:
+    """
+    Read-only scoring of any rows (not just new ones) against the stored
+    per-city, per-month statistics; the state is not updated. Used to show
+    flags for an arbitrary date range, e.g. in the dashboard.
+    """
+    metrics = [m for m in OUTLIER_METRICS if m in df.columns]
+    if df.empty or not metrics or not state["stats"]:
+        return pd.DataFrame(columns=["date", "city", "metric", "value", "zscore"])
+    return _flag(_to_long_metrics(df, metrics), _state_to_frame(state), z_threshold, min_count)
+
+
+def check_statistical_outliers(df: pd.DataFrame, state_path: str = OUTLIER_STATE_PATH, z_threshold: float = 4.0) -> pd.DataFrame:
+    """
+    Incremental outlier check: scores only the rows that arrived since the
+    last run against running per-city, per-month statistics and persists the updated state.
+    Returns the flagged values.
+    """
+    logger.info("Checking for statistical outliers...")
+    flagged, state = score_and_update_outliers(df, load_outlier_state(state_path), z_threshold=z_threshold)
+    save_outlier_state(state, state_path)
+    return flagged
@@ -5,8 +5,8 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 
 import pandas as pd
 from quality.check_missing import check_missing_values
-from quality.check_outliers import check_temperature_outliers, check_energy_outliers
-from quality.check_freshness import check_data_freshness
+from quality.check_outliers import check_energy_outliers, check_statistical_outliers, score_and_update_outliers
+from quality.check_freshness import check_freshness_from_index
 from common.loggerInfo import get_logger
 
 from datetime import datetime
@@ -16,6 +16,8 @@ logger = get_logger("quality_dashboard")
 
 # This is the command center that pulls everything together and gives you a readable report
 
+# Not a memoized stage: it exists for its side effects (quality log, outlier state)
+# and depends on today's date and the metadata index, which are not arguments
 def run_quality_checks(df: pd.DataFrame):
     """
     Run all quality checks and print the results.
@@ -40,14 +42,16 @@ def run_quality_checks(df: pd.DataFrame):
             logger.info("No missing values found.")
             f.write("[No Missing Values]\n")
         
-        #2. Temperature Outlier Check
-        temp_outliers = check_temperature_outliers(df)
-        if not temp_outliers.empty:
-            logger.info(f"Temperature Outliers Found: {len(temp_outliers)} rows")
-            logger.info(temp_outliers)
-            f.write(f"[Temp Outliers] {len(temp_outliers)} rows\n")
+        #2. Statistical Outlier Check (only rows newer than the last run are scored)
+        stat_outliers = check_statistical_outliers(df)
+        if not stat_outliers.empty:
+            logger.info(f"Statistical Outliers Found: {len(stat_outliers)} values")
+            logger.info(stat_outliers)
+            f.write(f"[Statistical Outliers] {len(stat_outliers)} values\n")
+            f.write(stat_outliers.groupby(["city", "metric"]).size().to_string())
+            f.write("\n")
         else:
-            logger.info(" No temperature outliers found.")
+            logger.info(" No statistical outliers found.")
         
         #3. Energy Outlier Check
         energy_outliers = check_energy_outliers(df)
@@ -58,19 +62,81 @@ def run_quality_checks(df: pd.DataFrame):
         else:
             logger.info(" No energy outliers found.")
             
-        # 4. Freshness Check
-        try: 
-            is_stale = check_data_freshness(df)
-            if is_stale:
-                logger.info(" Data is stale. Please refresh the data.")
-                f.write("[Data Freshness] Stale\n" if is_stale else "[Data Freshness] Fresh\n")
-            else:
-                logger.info(" Data is fresh and up-to-date.")
-                f.write("[Data Freshness] Fresh\n")
-        except Exception as e:
-            logger.error(f"An error occurred during data freshness check: {e}")
-            logger.error("Please check your data and try again.")
-            f.write(f"[Freshness Error] {e}\n")
+        # 4. Freshness Check (per city and source, from the metadata index)
+        write_freshness_report(f)
     
     logger.info(" Quality Checks Completed.")
-    
\ No newline at end of file
+    
+
+# ===========================
+# Per-city checks for the parallel pipeline
+# ===========================
+
+def write_freshness_report(f):
+    """
+    Writes the per-region freshness and gap report from the metadata index to an open log file.
+    """
+    try:
+        freshness = check_freshness_from_index()
+        if freshness.empty:
+            logger.info(" Metadata index is empty; nothing to check for freshness.")
+            f.write("[Data Freshness] No metadata\n")
+            return
+
+        stale = freshness[freshness["is_stale"]]
+        if not stale.empty:
+            logger.info(f" Stale regions: {len(stale)} of {len(freshness)} city/source pairs. Please refresh the data.")
+            f.write(f"[Data Freshness] Stale: {len(stale)} of {len(freshness)}\n")
+            f.write(stale[["city", "source", "max_date", "days_old"]].to_string(index=False))
+            f.write("\n")
+        else:
+            logger.info(" Data is fresh and up-to-date.")
+            f.write("[Data Freshness] Fresh\n")
+
+        gappy = freshness[freshness["gap_count"] > 0]
+        if not gappy.empty:
+            f.write("[Coverage Gaps]\n")
+            f.write(gappy[["city", "source", "gap_count", "gap_days"]].to_string(index=False))
+            f.write("\n")
+    except Exception as e:
+        logger.error(f"An error occurred during data freshness check: {e}")
+        logger.error("Please check your data and try again.")
+        f.write(f"[Freshness Error] {e}\n")
+
+
+def run_city_quality_checks(df: pd.DataFrame, outlier_state: dict):
+    """
+    Runs the quality checks for a single city's frame without touching any file,
+    so it can run inside a worker process.
+    Returns (summary dict, updated outlier state).
+    """
+    missing_count = df.isnull().sum()
+    stat_outliers, outlier_state = score_and_update_outliers(df, outlier_state)
+
+    summary = {
+        "rows": len(df),
+        "missing": {col: int(n) for col, n in missing_count.items() if n > 0},
+        "statistical_outliers": len(stat_outliers),
+        "negative_energy": int((df["energy_consumption"] < 0).sum()) if "energy_consumption" in df.columns else 0,
+    }
+    return summary, outlier_state
+
+
+def write_city_quality_report(summaries: dict):
+    """
+    Appends the per-city summaries produced by run_city_quality_checks to the quality log.
+    """
+    os.makedirs("data/quality_reports", exist_ok=True)
+    log_file = f"data/quality_reports/quality_log.txt"
+
+    with open(log_file, "a") as f:
+        f.write(f'\n=== Quality Check Run on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")} (per city) ===\n')
+        for city, summary in sorted(summaries.items()):
+            missing = ", ".join(f"{col}={n}" for col, n in summary["missing"].items()) or "none"
+            f.write(
+                f"[{city}] rows={summary['rows']} missing: {missing} | "
+                f"statistical outliers={summary['statistical_outliers']} | "
+                f"negative energy={summary['negative_energy']}\n"
+            )
+            logger.info(f"{city} quality: {summary}")
+        write_freshness_report(f)
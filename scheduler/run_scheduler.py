@@ -23,10 +23,25 @@ def run_fetch_historical():
     except subprocess.CalledProcessError as e:
         logger.error(f"Error running fetch_historical script: {e}")
         
+def run_archive_compaction():
+    """
+    Runs the raw archive compaction step, merging small segments and
+    dropping superseded revisions.
+    """
+    logger.info("Running raw archive compaction...")
+    try:
+        subprocess.run(["python", "pipeline/raw_archive.py", "compact"], check=True)
+        logger.info("Raw archive compaction completed successfully.")
+    except subprocess.CalledProcessError as e:
+        logger.error(f"Error running raw archive compaction: {e}")
+
 
 # Run every day at 06:00 AM
 schedule.every().day.at("06:00").do(run_fetch_historical)
 
+# Compact the raw archive once the morning fetch is done
+schedule.every().day.at("07:00").do(run_archive_compaction)
+
 while True:
     schedule.run_pending()
     time.sleep(60)  # Wait for one minute before checking again
@@ -3,6 +3,6 @@ from setuptools import setup, find_packages
 setup(
     name="energy_demand_forecasting",
     version="0.1",
-    packages=["pipeline", "quality"],  # includes pipeline/
+    packages=["pipeline", "quality", "forecasting"],  # includes pipeline/
     py_modules=["loggerInfo"],  # includes loggerInfo.py
 )
\ No newline at end of file
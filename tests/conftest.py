@@ -0,0 +1,7 @@
+import sys
+import os
+
+# Make the project packages importable without installing them
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+# The pipeline scripts import their siblings by bare module name
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "pipeline")))
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+from forecasting import backtest
+from forecasting.backtest import (
+    prepare_region_arrays, fold_coefficients, fold_origins, backtest_region, _predict_folds,
+)
+from forecasting.models import TemperatureRegressionModel, design_matrix
+from common.kernels import weekday_codes
+from common.series_store import SeriesStore
+
+
+def region_series(days=120, seed=0, missing=()):
+    rng = np.random.default_rng(seed)
+    dates = np.arange(np.datetime64("2024-01-01"), np.datetime64("2024-01-01") + days)
+    avg_temp = 150 + 100 * np.sin(np.arange(days) / 20) + rng.normal(0, 20, days)
+    energy = 1e5 + 0.4 * (avg_temp - 150) ** 2 + 3000 * (weekday_codes(dates) >= 5) + rng.normal(0, 500, days)
+    avg_temp[list(missing)] = np.nan
+    return dates, avg_temp, energy
+
+
+@pytest.mark.parametrize("window", [None, 30])
+def test_fold_coefficients_match_direct_least_squares(window):
+    dates, avg_temp, energy = region_series(missing=[5, 40, 41])
+    arrays = prepare_region_arrays(dates, avg_temp, energy)
+    origins = fold_origins(len(dates), horizon=7, min_train=35, step=9)
+
+    coef = fold_coefficients(arrays, origins, window)
+
+    scaled = (avg_temp - arrays["temp_mean"]) / arrays["temp_std"]
+    for k, origin in enumerate(origins):
+        start = max(origin - window, 0) if window else 0
+        rows = np.arange(start, origin)
+        rows = rows[~np.isnan(avg_temp[rows])]
+        X = design_matrix(scaled[rows], weekday_codes(dates[rows]))
+        expected = np.linalg.lstsq(X, energy[rows], rcond=None)[0]
+        np.testing.assert_allclose(coef[k], expected, rtol=1e-6, atol=1e-6)
+
+
+def test_regression_folds_match_the_served_forecast():
+    dates, avg_temp, energy = region_series()
+    arrays = prepare_region_arrays(dates, avg_temp, energy)
+    origins = np.array([40, 77, 100])
+
+    predicted = _predict_folds(arrays, "temperature_regression", origins, 7, None)
+
+    for k, origin in enumerate(origins):
+        model = TemperatureRegressionModel().fit(dates[:origin], avg_temp[:origin], energy[:origin])
+        _, expected = model.forecast(7)
+        np.testing.assert_allclose(predicted[k], expected, rtol=1e-6)
+
+
+def test_regression_folds_do_not_see_test_day_weather():
+    dates, avg_temp, energy = region_series()
+    changed = avg_temp.copy()
+    changed[60:67] += 200  # Heat wave in the first fold's test week
+
+    kwargs = dict(horizon=7, min_train=60, step=7, models=["temperature_regression", "temperature_regression_oracle"])
+    before = backtest_region("R", dates, avg_temp, energy, **kwargs)
+    after = backtest_region("R", dates, changed, energy, **kwargs)
+
+    first_origin = dates[60]
+    for model, same in (("temperature_regression", True), ("temperature_regression_oracle", False)):
+        a = before[(before["model"] == model) & (before["origin"] == first_origin)]["error"].to_numpy()
+        b = after[(after["model"] == model) & (after["origin"] == first_origin)]["error"].to_numpy()
+        assert np.allclose(a, b) == same
+
+
+def test_run_backtest_with_no_known_region_returns_empty(monkeypatch):
+    dates, avg_temp, energy = region_series(days=60)
+    store = SeriesStore.from_frame(pd.DataFrame({"date": dates, "city": "Chicago", "avg_temp": avg_temp, "energy_consumption": energy}))
+    monkeypatch.setattr(backtest, "ensure_catalog", lambda: None)
+    monkeypatch.setattr(backtest, "current_dataset", lambda: {"version": 1})
+    monkeypatch.setattr(backtest, "load_training_store", lambda dataset: store)
+
+    assert backtest.run_backtest(regions=["Nowhere"]).empty
@@ -0,0 +1,68 @@
+import os
+import json
+import math
+from datetime import date
+import pandas as pd
+from pipeline.bulk_ingest import read_ghcn_dly, read_ghcn_by_year, read_eia_bulk
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def test_dly_keeps_configured_stations_and_passing_values():
+    frames = read_ghcn_dly(os.path.join(FIXTURES, "USW00094846.dly"))
+
+    assert list(frames) == ["Chicago"]
+    df = frames["Chicago"]
+    assert list(df.columns) == ["date", "city", "TMAX", "TMIN"]
+    assert df["date"].tolist() == [date(2024, 2, 1), date(2024, 3, 1)]
+    assert df["TMAX"].tolist() == [50.0, 70.0]
+    assert df["TMIN"].iloc[0] == -22.0 and math.isnan(df["TMIN"].iloc[1])
+
+
+def test_dly_date_range():
+    frames = read_ghcn_dly(os.path.join(FIXTURES, "USW00094846.dly"), start_date=date(2024, 2, 15))
+    assert frames["Chicago"]["date"].tolist() == [date(2024, 3, 1)]
+
+
+def test_by_year_csv_filters_stations_elements_and_qc():
+    frames = read_ghcn_by_year(os.path.join(FIXTURES, "ghcn_by_year.csv"), end_date=date(2024, 1, 3))
+
+    assert sorted(frames) == ["Chicago", "Houston"]
+    chicago = frames["Chicago"]
+    assert chicago["date"].tolist() == [date(2024, 1, 1)]
+    assert (chicago["TMAX"].iloc[0], chicago["TMIN"].iloc[0]) == (33.0, -11.0)
+    houston = frames["Houston"]
+    assert houston["TMAX"].tolist() == [200.0] and houston["TMIN"].isna().all()
+
+
+def hourly_series(respondent, tz, start, end, skip=()):
+    """
+    EIA-style hourly demand: hour-ending local periods with their UTC offset, 100 per hour.
+    """
+    hours = pd.date_range(start, end, freq="h", tz="UTC").tz_convert(tz)
+    data = []
+    for t in hours:
+        period = f"{t:%Y%m%dT%H}{int(t.utcoffset().total_seconds() // 3600):+03d}"
+        if period not in skip:
+            data.append([period, 100.0])
+    return {"series_id": f"EBA.{respondent}-ALL.D.HL", "data": data}
+
+
+def test_eia_bulk_keeps_only_complete_local_days(tmp_path):
+    path = tmp_path / "EBA.txt"
+    series = [
+        # New York around the spring-forward change on 2024-03-10; the last hour of 2024-03-12 is missing
+        hourly_series("NYIS", "America/New_York", "2024-03-09 06:00", "2024-03-13 05:00", skip={"20240313T00-04"}),
+        # Arizona has no DST
+        hourly_series("AZPS", "America/Phoenix", "2024-03-10 08:00", "2024-03-11 07:00"),
+        {"series_id": "EBA.NYIS-ALL.NG.HL", "data": [["20240309T01-05", 5.0]]},
+    ]
+    path.write_text("".join(json.dumps(s) + "\n" for s in series))
+
+    frames = read_eia_bulk(str(path))
+
+    ny = frames["New York"]
+    assert ny["date"].tolist() == [date(2024, 3, 9), date(2024, 3, 10), date(2024, 3, 11)]
+    assert ny["energy_consumption"].tolist() == [2400.0, 2300.0, 2400.0]
+    assert (ny["type"].unique().tolist(), ny["timezone"].unique().tolist()) == (["D"], ["Eastern"])
+    assert frames["Phoenix"]["energy_consumption"].tolist() == [2400.0]
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+from quality.check_outliers import combine_stats, score_and_update_outliers
+
+
+def stats_of(values):
+    values = np.asarray(values, dtype="float64")
+    return pd.DataFrame({"count": [len(values)], "mean": [values.mean() if len(values) else 0.0],
+                         "m2": [((values - values.mean()) ** 2).sum() if len(values) else 0.0]})
+
+
+def january_frame(values, start="2024-01-01", city="Chicago"):
+    return pd.DataFrame({
+        "date": pd.date_range(start, periods=len(values), freq="D"),
+        "city": city,
+        "energy_consumption": values,
+    })
+
+
+@pytest.mark.parametrize("split", [0, 1, 7, 20])
+def test_combine_matches_full_sample(split):
+    values = np.random.default_rng(0).normal(100, 15, 20)
+    merged = combine_stats(stats_of(values[:split]), stats_of(values[split:])).iloc[0]
+
+    assert merged["count"] == 20
+    assert merged["mean"] == pytest.approx(values.mean())
+    assert merged["m2"] == pytest.approx(((values - values.mean()) ** 2).sum())
+
+
+def test_new_outlier_is_scored_against_prior_statistics():
+    # 30 January values with mean 0 and std 10
+    state = {"watermarks": {"Chicago": "2023-12-31"}, "stats": {"Chicago": {"energy_consumption": {"1": [30, 0.0, 3000.0]}}}}
+
+    flagged, new_state = score_and_update_outliers(january_frame([50.0]), state)
+
+    assert flagged["value"].tolist() == [50.0]
+    assert flagged["zscore"].iloc[0] == pytest.approx(5.0)
+    count, mean, m2 = new_state["stats"]["Chicago"]["energy_consumption"]["1"]
+    assert count == 31 and mean == pytest.approx(50 / 31)
+    assert new_state["watermarks"]["Chicago"] == "2024-01-01"
+    assert state["stats"]["Chicago"]["energy_consumption"]["1"] == [30, 0.0, 3000.0]
+
+
+def test_first_batch_is_scored_against_its_own_statistics():
+    values = [100.0 + (i % 3) for i in range(30)] + [400.0]
+    flagged, state = score_and_update_outliers(january_frame(values), {"watermarks": {}, "stats": {}})
+
+    assert flagged["value"].tolist() == [400.0]
+    assert state["stats"]["Chicago"]["energy_consumption"]["1"][0] == 31
+
+
+def test_rows_before_watermark_are_skipped():
+    state = {"watermarks": {"Chicago": "2024-01-31"}, "stats": {}}
+    flagged, new_state = score_and_update_outliers(january_frame([1.0, 1e9]), state)
+
+    assert flagged.empty
+    assert new_state == state
@@ -0,0 +1,47 @@
+import os
+import pandas as pd
+from pipeline.memo import StageRunner, stage, KEEP_RUNS
+
+
+@stage("double", inputs=["df"])
+def double(df):
+    return df * 2
+
+
+def city_frames(n):
+    return [pd.DataFrame({"city": [f"city{i}"], "value": [float(i)]}) for i in range(n)]
+
+
+def run_pipeline(cache_dir, frames):
+    runner = StageRunner(cache_dir=str(cache_dir))
+    for df in frames:
+        runner.run(double, df)
+    runner.prune()
+    return runner.stats["double"]
+
+
+def test_rerun_with_more_cities_than_runs_kept_hits_every_city(tmp_path):
+    frames = city_frames(KEEP_RUNS + 3)
+
+    assert run_pipeline(tmp_path, frames) == {"hits": 0, "misses": len(frames)}
+    for _ in range(KEEP_RUNS + 1):
+        assert run_pipeline(tmp_path, frames) == {"hits": len(frames), "misses": 0}
+
+
+def test_outputs_unused_in_the_last_runs_are_pruned(tmp_path):
+    old, *current = city_frames(3)
+    run_pipeline(tmp_path, [old])
+    stale = [os.path.join(tmp_path, "double", f) for f in os.listdir(tmp_path / "double")]
+    # Pretend the first run happened a while ago
+    for path in stale:
+        os.utime(path, (0, 0))
+    with open(tmp_path / "runs.json", "w") as f:
+        f.write("[0]")
+
+    for _ in range(KEEP_RUNS - 1):
+        run_pipeline(tmp_path, current)
+    assert all(os.path.exists(path) for path in stale)
+
+    run_pipeline(tmp_path, current)
+    assert not any(os.path.exists(path) for path in stale)
+    assert run_pipeline(tmp_path, current) == {"hits": len(current), "misses": 0}
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+from pipeline.metadata_index import update_metadata, load_metadata_index
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    return str(tmp_path / "index.json")
+
+
+def dates(start, days, per_day=1):
+    return pd.Series(pd.date_range(start, periods=days, freq="D").repeat(per_day))
+
+
+def test_overlapping_writes_count_each_day_once(index_path):
+    # Three overlapping 91-day windows, one day apart
+    for offset in range(3):
+        update_metadata("Chicago", "weather", dates(pd.Timestamp("2024-01-01") + pd.Timedelta(days=offset), 91), path=index_path)
+
+    entry = load_metadata_index(index_path)["Chicago"]["weather"]
+    assert (entry["rows"], entry["days"]) == (93, 93)
+    assert entry["covered"] == [["2024-01-01", "2024-04-02"]]
+    assert entry["day_rows"] == [["2024-01-01", "2024-04-02", 1]]
+
+
+def test_refetched_days_take_the_latest_count_and_gaps_are_kept(index_path):
+    update_metadata("Chicago", "energy", dates("2024-01-01", 10, per_day=20), path=index_path)
+    update_metadata("Chicago", "energy", dates("2024-01-06", 5, per_day=4), path=index_path)
+    update_metadata("Chicago", "energy", dates("2024-01-20", 2, per_day=20), path=index_path)
+
+    entry = load_metadata_index(index_path)["Chicago"]["energy"]
+    assert entry["rows"] == 5 * 20 + 5 * 4 + 2 * 20
+    assert entry["days"] == 12
+    assert entry["gaps"] == [["2024-01-11", "2024-01-19"]]
+    assert entry["day_rows"] == [
+        ["2024-01-01", "2024-01-05", 20], ["2024-01-06", "2024-01-10", 4], ["2024-01-20", "2024-01-21", 20],
+    ]
+
+
+def test_replace_drops_earlier_coverage(index_path):
+    update_metadata("Chicago", "processed", dates("2024-01-01", 10), path=index_path)
+    update_metadata("Chicago", "processed", dates("2024-02-01", 3), replace=True, path=index_path)
+
+    entry = load_metadata_index(index_path)["Chicago"]["processed"]
+    assert (entry["min_date"], entry["rows"], entry["gaps"]) == ("2024-02-01", 3, [])
@@ -0,0 +1,139 @@
+import os
+import json
+import pandas as pd
+import pytest
+from pipeline import raw_archive
+from pipeline.raw_archive import append_raw, read_raw, compact_series, series_id_for
+
+
+@pytest.fixture(autouse=True)
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(raw_archive, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    return tmp_path / "archive"
+
+
+def weather_frame(start, days, offset=0.0):
+    dates = pd.date_range(start, periods=days, freq="D").date
+    return pd.DataFrame({
+        "date": dates,
+        "city": "Chicago",
+        "TMAX": [100.0 + i + offset for i in range(days)],
+        "TMIN": [10.0 + i + offset for i in range(days)],
+    })
+
+
+def energy_frame(start, days):
+    rows = []
+    for date in pd.date_range(start, periods=days, freq="D").date:
+        for type_, base in (("D", 1000.0), ("DF", 1010.0), ("TI", -50.0)):
+            for timezone, shift in (("Central", 0.0), ("Eastern", 5.0)):
+                rows.append({"date": date, "city": "Chicago", "reg_id": "PJM", "type": type_,
+                             "timezone": timezone, "energy_consumption": base + shift})
+    return pd.DataFrame(rows)
+
+
+def segments(source, city="Chicago"):
+    path = os.path.join(raw_archive._series_dir(source, series_id_for(city, source)), "index.json")
+    with open(path) as f:
+        return json.load(f)["segments"]
+
+
+def test_weather_round_trip():
+    df = weather_frame("2024-01-01", 5)
+    assert append_raw(df, "Chicago", "weather") == 10  # TMAX and TMIN per day
+
+    out = read_raw("Chicago", "weather")
+    pd.testing.assert_frame_equal(out, df, check_dtype=False)
+
+
+def test_energy_round_trip_keeps_type_and_timezone():
+    df = energy_frame("2024-01-01", 3)
+    append_raw(df, "Chicago", "energy")
+
+    out = read_raw("Chicago", "energy", "2024-01-02", "2024-01-02")
+    assert list(out.columns) == ["date", "city", "reg_id", "type", "timezone", "energy_consumption"]
+    assert len(out) == 6
+    demand = out[(out["type"] == "D") & (out["timezone"] == "Central")]
+    assert demand["energy_consumption"].tolist() == [1000.0]
+
+
+def test_overlapping_appends_are_deduplicated():
+    append_raw(weather_frame("2024-01-01", 5), "Chicago", "weather")
+    # Days 3-5 repeat the first run with identical values; days 6-7 are new
+    written = append_raw(weather_frame("2024-01-01", 7).iloc[2:], "Chicago", "weather")
+
+    assert written == 4
+    assert len(segments("weather")) == 2
+    assert len(read_raw("Chicago", "weather")) == 7
+
+
+def test_revision_supersedes_only_the_changed_key():
+    df = energy_frame("2024-01-01", 2)
+    append_raw(df, "Chicago", "energy")
+
+    revised = df.copy()
+    changed = (revised["type"] == "D") & (revised["timezone"] == "Central") & (revised["date"] == revised["date"].min())
+    revised.loc[changed, "energy_consumption"] = 999.0
+    assert append_raw(revised, "Chicago", "energy") == 1
+
+    out = read_raw("Chicago", "energy")
+    merged = out.merge(df, on=["date", "type", "timezone"], suffixes=("", "_orig"))
+    differs = merged["energy_consumption"] != merged["energy_consumption_orig"]
+    assert differs.sum() == 1
+    assert merged.loc[differs, "energy_consumption"].tolist() == [999.0]
+
+
+def test_energy_without_type_is_rejected():
+    df = energy_frame("2024-01-01", 1).drop(columns=["type"])
+    with pytest.raises(ValueError):
+        append_raw(df, "Chicago", "energy")
+
+
+def test_compaction_merges_segments_and_drops_superseded_revisions():
+    append_raw(weather_frame("2024-01-01", 5), "Chicago", "weather")
+    append_raw(weather_frame("2024-01-04", 5), "Chicago", "weather")
+    append_raw(weather_frame("2024-01-01", 2, offset=0.5), "Chicago", "weather")
+    before = read_raw("Chicago", "weather")
+
+    assert compact_series("weather", series_id_for("Chicago", "weather"), min_segments=2)
+
+    files = segments("weather")
+    assert len(files) == 1
+    series_dir = raw_archive._series_dir("weather", series_id_for("Chicago", "weather"))
+    assert sorted(f for f in os.listdir(series_dir) if f.endswith(".csv")) == [files[0]["file"]]
+    assert files[0]["rows"] == 16  # 8 days x TMAX/TMIN, one revision each
+    pd.testing.assert_frame_equal(read_raw("Chicago", "weather"), before)
+
+
+def test_compaction_skips_series_below_threshold():
+    append_raw(weather_frame("2024-01-01", 3), "Chicago", "weather")
+    assert not compact_series("weather", series_id_for("Chicago", "weather"), min_segments=2)
+
+
+def test_compaction_partitions_by_year_and_rewrites_only_touched_years(monkeypatch):
+    append_raw(weather_frame("2022-12-20", 30), "Chicago", "weather")
+    append_raw(weather_frame("2023-12-20", 30), "Chicago", "weather")
+    series_id = series_id_for("Chicago", "weather")
+    assert compact_series("weather", series_id, min_segments=2)
+
+    files = segments("weather")
+    assert [f["year"] for f in files] == [2022, 2023, 2024]
+    assert all(f["min_date"][:4] == f["max_date"][:4] == str(f["year"]) for f in files)
+    before = read_raw("Chicago", "weather")
+
+    # A revision in 2024 only rewrites the 2024 segment
+    append_raw(weather_frame("2024-01-10", 1, offset=0.5), "Chicago", "weather")
+    append_raw(weather_frame("2024-01-11", 1, offset=0.5), "Chicago", "weather")
+    assert compact_series("weather", series_id, min_segments=2)
+    after = segments("weather")
+    assert [f["file"] for f in after[:2]] == [f["file"] for f in files[:2]]
+    assert after[2]["year"] == 2024 and after[2]["file"] != files[2]["file"]
+
+    # Range reads open only the segments of the years they cover
+    opened = []
+    read_segment = raw_archive._read_segment
+    monkeypatch.setattr(raw_archive, "_read_segment", lambda d, seg: opened.append(seg["year"]) or read_segment(d, seg))
+    out = read_raw("Chicago", "weather", "2024-01-01", "2024-01-18")
+    assert opened == [2024]
+    assert len(out) == 18
+    assert len(read_raw("Chicago", "weather")) == len(before)